@@ -0,0 +1,49 @@
+"""add full text search index
+
+Revision ID: 2c7a9e4f1b38
+Revises: f1b4c7d9e205
+Create Date: 2026-10-16 20:11:52.370184
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c7a9e4f1b38'
+down_revision: Union[str, Sequence[str], None] = 'f1b4c7d9e205'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # Maintained by Postgres on every write; titles weigh more than content
+        op.execute(
+            "ALTER TABLE posts ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', title), 'A') || "
+            "setweight(to_tsvector('simple', content), 'B')"
+            ") STORED"
+        )
+        op.create_index('ix_posts_search_vector', 'posts', ['search_vector'], unique=False, postgresql_using='gin')
+    elif dialect == 'sqlite':
+        # Kept in sync by the post write handlers, see search.SQLiteSearch
+        op.execute(
+            "CREATE VIRTUAL TABLE posts_fts USING fts5("
+            "title, content, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        op.execute(sa.text('INSERT INTO posts_fts (rowid, title, content) SELECT id, title, content FROM posts'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.drop_index('ix_posts_search_vector', table_name='posts', postgresql_using='gin')
+        op.drop_column('posts', 'search_vector')
+    elif dialect == 'sqlite':
+        op.execute('DROP TABLE posts_fts')
@@ -0,0 +1,49 @@
+"""add updated_at to posts and users
+
+Revision ID: 9b1e6f4c2a77
+Revises: 4a6d9e2b7f30
+Create Date: 2026-10-16 17:21:08.514930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b1e6f4c2a77'
+down_revision: Union[str, Sequence[str], None] = '4a6d9e2b7f30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _restore_lower_indexes() -> None:
+    # On SQLite the batch operations rebuild users, and expression indexes
+    # cannot be reflected, so the lower() lookup indexes are dropped with
+    # the old table
+    op.create_index('ix_users_username_lower', 'users', [sa.literal_column('lower(username)')], unique=False, if_not_exists=True)
+    op.create_index('ix_users_email_lower', 'users', [sa.literal_column('lower(email)')], unique=False, if_not_exists=True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('posts', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('users', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+    # Existing rows start out as last modified when they were posted / now
+    op.execute(sa.text('UPDATE posts SET updated_at = date_posted'))
+    op.execute(sa.text('UPDATE users SET updated_at = CURRENT_TIMESTAMP'))
+    with op.batch_alter_table('posts') as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(timezone=True), nullable=False)
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(timezone=True), nullable=False)
+    _restore_lower_indexes()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('updated_at')
+    _restore_lower_indexes()
+    with op.batch_alter_table('posts') as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,51 @@
+"""add excerpt to posts
+
+Revision ID: c3e8f1a5d094
+Revises: 9b1e6f4c2a77
+Create Date: 2026-10-16 18:02:44.187306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e8f1a5d094'
+down_revision: Union[str, Sequence[str], None] = '9b1e6f4c2a77'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+EXCERPT_LENGTH = 200
+
+
+def _excerpt(content: str) -> str:
+    # Frozen copy of models.make_excerpt as of this revision
+    text = " ".join(content.split())
+    if len(text) <= EXCERPT_LENGTH:
+        return text
+    cut = text[: EXCERPT_LENGTH - 1]
+    if " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut.rstrip() + "…"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('posts', sa.Column('excerpt', sa.String(length=EXCERPT_LENGTH), nullable=True))
+    posts = sa.table('posts', sa.column('id', sa.Integer), sa.column('content', sa.Text), sa.column('excerpt', sa.String))
+    connection = op.get_bind()
+    rows = connection.execute(sa.select(posts.c.id, posts.c.content)).all()
+    for post_id, content in rows:
+        connection.execute(
+            posts.update().where(posts.c.id == post_id).values(excerpt=_excerpt(content))
+        )
+    with op.batch_alter_table('posts') as batch_op:
+        batch_op.alter_column('excerpt', existing_type=sa.String(length=EXCERPT_LENGTH), nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('posts') as batch_op:
+        batch_op.drop_column('excerpt')
@@ -1,32 +1,112 @@
-from datetime import UTC, datetime, timedelta
+import asyncio
 import hashlib
+import multiprocessing
 import secrets
-from typing import Annotated
-
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import UTC, datetime, timedelta
+from typing import Annotated, Any
 
+import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-import jwt
 from pwdlib import PasswordHash
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
-from models import User
+from cache import TTLCache
 from config import settings
 from database import get_db
-
+from models import User
 
 PASWORD_HASHER = PasswordHash.recommended()
 
 OAUTH2_SCHEME = OAuth2PasswordBearer(tokenUrl="api/users/token")
+OPTIONAL_OAUTH2_SCHEME = OAuth2PasswordBearer(tokenUrl="api/users/token", auto_error=False)
+
+USER_CACHE: TTLCache[int, dict[str, Any]] = TTLCache(
+    maxsize=settings.USER_CACHE_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+)
 
+TOKEN_CACHE: TTLCache[bytes, tuple[str | None, float]] = TTLCache(
+    maxsize=settings.TOKEN_CACHE_SIZE,
+    ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
 
-def hash_password(password: str) -> str:
+
+_hash_executor: ProcessPoolExecutor | None = None
+_pending_hashes = 0
+
+
+def _hash_password(password: str) -> str:
     return PASWORD_HASHER.hash(password)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
     return PASWORD_HASHER.verify(plain_password, hashed_password)
 
+def _hash_pool() -> ProcessPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        # Spawn rather than fork: the server process already runs threads
+        _hash_executor = ProcessPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _hash_executor
+
+def _discard_hash_pool(executor: ProcessPoolExecutor) -> None:
+    """Drop a pool whose worker died, so the next call starts a fresh one."""
+    global _hash_executor
+    if _hash_executor is executor:
+        _hash_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+async def _run_in_hash_pool[T](func: Callable[..., T], *args: Any) -> T:
+    """Run an Argon2 call in the hashing process pool, off the event loop.
+
+    A pool broken by a dead worker (OOM kill, crash) is replaced and the
+    call retried once; if that fails too, the request gets a 503.
+    """
+    global _pending_hashes
+    if _pending_hashes >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE,
+                            "Server is busy, please try again shortly",
+                            headers={"Retry-After": "1"})
+    _pending_hashes += 1
+    try:
+        loop = asyncio.get_running_loop()
+        executor = _hash_pool()
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            _discard_hash_pool(executor)
+        executor = _hash_pool()
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool as err:
+            _discard_hash_pool(executor)
+            raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE,
+                                "Server is busy, please try again shortly",
+                                headers={"Retry-After": "1"}) from err
+    finally:
+        _pending_hashes -= 1
+
+def shutdown_hash_executor() -> None:
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(cancel_futures=True)
+        _hash_executor = None
+
+async def hash_password(password: str) -> str:
+    return await _run_in_hash_pool(_hash_password, password)
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_pool(_verify_password, plain_password, hashed_password)
+
 def generate_reset_token() -> str:
     return secrets.token_urlsafe(32)
 
@@ -53,6 +133,14 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
 
 def verify_access_token(token: str) -> str | None:
     """Verify a JWT access token and return the subject (user ID) if valid."""
+    digest = hashlib.sha256(token.encode()).digest()
+    cached = TOKEN_CACHE.get(digest)
+    if cached is not None:
+        sub, exp = cached
+        if exp > time.time():
+            return sub
+        TOKEN_CACHE.invalidate(digest)
+
     try:
         payload = jwt.decode(
             token,
@@ -62,8 +150,26 @@ def verify_access_token(token: str) -> str | None:
         )
     except (jwt.InvalidTokenError, jwt.ExpiredSignatureError):
         return None
-    else:
-        return payload.get("sub")
+
+    sub, exp = payload.get("sub"), payload["exp"]
+    # Expire the entry with the token so it never outlives the signature check
+    TOKEN_CACHE.set(digest, (sub, exp), ttl=exp - time.time())
+    return sub
+
+
+# Never cached: password checks always read the current hash from the row
+_UNCACHED_USER_COLUMNS = frozenset({"password_hash"})
+
+
+def _cache_user(user: User) -> None:
+    USER_CACHE.set(
+        user.id,
+        {
+            attr.key: getattr(user, attr.key)
+            for attr in User.__mapper__.column_attrs
+            if attr.key not in _UNCACHED_USER_COLUMNS
+        },
+    )
 
 
 async def get_current_user(
@@ -81,6 +187,15 @@ async def get_current_user(
         raise HTTPException(status.HTTP_401_UNAUTHORIZED,
                             "Invalid or expired token",
                             headers={"WWW-Authenticate": "Bearer"})
+    snapshot = USER_CACHE.get(user_id_int)
+    if snapshot is not None:
+        # Attach a copy of the cached row without another SELECT, so handlers
+        # can still modify and commit the current user. password_hash is left
+        # unloaded; read it with a query of its own.
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return await db.merge(user, load=False)
+
     result = await db.execute(
         select(User)
         .where(User.id == user_id_int),
@@ -90,6 +205,29 @@ async def get_current_user(
         raise HTTPException(status.HTTP_401_UNAUTHORIZED,
                             "User not found",
                             headers={"WWW-Authenticate": "Bearer"})
+    _cache_user(user)
     return user
 
+
+def invalidate_cached_user(user_id: int) -> None:
+    """Drop a user's cached snapshot after their row changes."""
+    USER_CACHE.invalidate(user_id)
+
+async def get_viewer_id(
+    token: Annotated[str | None, Depends(OPTIONAL_OAUTH2_SCHEME)],
+) -> int | None:
+    """Id of the user behind an optional bearer token, without loading them.
+
+    For public reads that only personalize their output, so a missing,
+    invalid or expired token just makes the request anonymous (None).
+    """
+    if token is None:
+        return None
+    user_id = verify_access_token(token)
+    try:
+        return int(user_id)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return None
+
 CurrentUser = Annotated[User, Depends(get_current_user)]
+ViewerId = Annotated[int | None, Depends(get_viewer_id)]
@@ -0,0 +1,160 @@
+"""Setup shared by the benchmark scripts.
+
+Run a script from the repository root against a database of its own:
+
+    DATABASE_URL=sqlite+aiosqlite:///bench.db SECRET_KEY=bench \\
+        python -m benchmarks.feed_pagination
+
+Scripts migrate that database to head and add the rows they need, so
+never point them at one whose data matters.
+"""
+import time
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime, timedelta
+from io import BytesIO
+
+import httpx
+from alembic.command import upgrade
+from alembic.config import Config
+from PIL import Image
+from sqlalchemy import func, insert, select
+
+import models
+from auth import create_access_token
+from database import AsyncSessionLocal
+
+INSERT_BATCH = 10_000
+PASSWORD = "benchmark-password"
+
+
+def migrate() -> None:
+    upgrade(Config("alembic.ini"), "head")
+
+
+@asynccontextmanager
+async def app_client() -> AsyncIterator[httpx.AsyncClient]:
+    """A client calling the app in process, with its lifespan running."""
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with (
+        app.router.lifespan_context(app),
+        httpx.AsyncClient(transport=transport, base_url="http://localhost") as client,
+    ):
+        yield client
+
+
+async def create_users(count: int) -> list[int]:
+    """Insert `count` users that cannot log in; see `bearer` for their tokens."""
+    names = [f"bench{uuid.uuid4().hex[:12]}" for _ in range(count)]
+    async with AsyncSessionLocal() as db:
+        for start in range(0, count, INSERT_BATCH):
+            await db.execute(
+                insert(models.User),
+                [
+                    {"username": name, "email": f"{name}@example.com", "password_hash": "-"}
+                    for name in names[start : start + INSERT_BATCH]
+                ],
+            )
+        await db.commit()
+        result = await db.execute(select(models.User.id).where(models.User.username.in_(names)))
+        return sorted(result.scalars())
+
+
+async def register(client: httpx.AsyncClient) -> tuple[int, dict[str, str]]:
+    """Sign up a fresh user through the API; returns its id and auth headers."""
+    name = f"bench{uuid.uuid4().hex[:12]}"
+    email = f"{name}@example.com"
+    response = await client.post(
+        "/api/users",
+        json={"username": name, "email": email, "password": PASSWORD},
+    )
+    response.raise_for_status()
+    user_id = response.json()["id"]
+    response = await client.post("/api/users/token", data={"username": email, "password": PASSWORD})
+    response.raise_for_status()
+    return user_id, {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def bearer(user_id: int) -> dict[str, str]:
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+
+async def count_posts() -> int:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(func.count()).select_from(models.Post))).scalar_one()
+
+
+async def seed_posts(
+    count: int,
+    user_ids: list[int],
+    content: Callable[[int], str] = lambda i: f"Benchmark post number {i}.",
+) -> None:
+    """Bulk insert `count` posts, one second apart, round-robin over `user_ids`.
+
+    Goes straight to the table, so post counters and the SQLite full-text
+    table are not updated; `POST_COUNT_MODE=exact` counts them anyway.
+    """
+    start_date = datetime.now(UTC) - timedelta(seconds=count)
+    async with AsyncSessionLocal() as db:
+        for start in range(0, count, INSERT_BATCH):
+            rows = []
+            for i in range(start, min(start + INSERT_BATCH, count)):
+                text = content(i)
+                rows.append({
+                    "title": f"Post {i}",
+                    "content": text,
+                    "excerpt": models.make_excerpt(text),
+                    "user_id": user_ids[i % len(user_ids)],
+                    "date_posted": start_date + timedelta(seconds=i),
+                })
+            await db.execute(insert(models.Post), rows)
+        await db.commit()
+
+
+def synthetic_photo(width: int, height: int, seed: int = 0) -> bytes:
+    """A JPEG of smooth gradients under coarse noise, sized like a photo.
+
+    Compresses about as well as a real photo, so a 24MP one still fits
+    under the default upload limit. Different seeds give different bytes.
+    """
+    size = (width, height)
+    noise = Image.effect_noise((width // 8, height // 8), 40).resize(size)
+    red = Image.linear_gradient("L").rotate(seed * 37 % 360).resize(size)
+    blue = Image.radial_gradient("L").resize(size)
+    image = Image.merge(
+        "RGB",
+        (Image.blend(red, noise, 0.2), noise, Image.blend(blue, noise, 0.2)),
+    )
+    output = BytesIO()
+    image.save(output, "JPEG", quality=80)
+    return output.getvalue()
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(label: str, seconds: list[float]) -> str:
+    """One line with the count, p50, p99 and max of `seconds`, in milliseconds."""
+    if not seconds:
+        return f"{label}: n=0"
+    return (
+        f"{label}: n={len(seconds)}"
+        f" p50={percentile(seconds, 50) * 1000:.2f}ms"
+        f" p99={percentile(seconds, 99) * 1000:.2f}ms"
+        f" max={max(seconds) * 1000:.2f}ms"
+    )
+
+
+async def timed(call: Callable[[], Awaitable[object]], repeat: int) -> list[float]:
+    """Await `call()` `repeat` times in a row; returns each wall time."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - started)
+    return samples
@@ -0,0 +1,68 @@
+"""Latency of a deep home-feed page, by offset and by cursor.
+
+Seeds the posts table up to `--posts` rows, then requests page `--page`
+of GET /api/posts both ways: with `skip`, which makes the database walk
+past every earlier row, and with the cursor of the previous page, which
+seeks straight to it. Totals are left out so only the page query is
+timed.
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import select
+
+import models
+from benchmarks.common import (
+    app_client,
+    count_posts,
+    create_users,
+    migrate,
+    seed_posts,
+    summarize,
+    timed,
+)
+from database import AsyncSessionLocal
+from pagination import FEED_ORDER, encode_cursor
+
+
+async def main(args: argparse.Namespace) -> None:
+    existing = await count_posts()
+    if existing < args.posts:
+        print(f"Seeding {args.posts - existing} posts...")
+        await seed_posts(args.posts - existing, await create_users(100))
+
+    skip = args.page * args.limit
+    async with AsyncSessionLocal() as db:
+        # The last post of the previous page, as its next_cursor names it
+        result = await db.execute(
+            select(models.Post).order_by(*FEED_ORDER).offset(skip - 1).limit(1),
+        )
+        cursor = encode_cursor(result.scalar_one())
+
+    async with app_client() as client:
+        offset_params = {"skip": skip, "limit": args.limit, "include_total": False}
+        cursor_params = {"cursor": cursor, "limit": args.limit, "include_total": False}
+        offset_page = (await client.get("/api/posts", params=offset_params)).json()
+        cursor_page = (await client.get("/api/posts", params=cursor_params)).json()
+        assert offset_page["posts"] == cursor_page["posts"], "pages differ"
+
+        async def by_offset() -> None:
+            (await client.get("/api/posts", params=offset_params)).raise_for_status()
+
+        async def by_cursor() -> None:
+            (await client.get("/api/posts", params=cursor_params)).raise_for_status()
+
+        print(f"Page {args.page} of {args.limit} posts, {max(existing, args.posts)} posts in all")
+        print(summarize("skip  ", await timed(by_offset, args.repeat)))
+        print(summarize("cursor", await timed(by_cursor, args.repeat)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--page", type=int, default=10_000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    migrate()
+    asyncio.run(main(args))
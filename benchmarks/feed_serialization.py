@@ -0,0 +1,93 @@
+"""CPU time and allocations to serialize a page of 100 posts.
+
+Serializes the same `limit + 1` ORM rows, loaded once, two ways:
+`paginated_posts_json`, which validates them in one call and dumps
+straight to bytes, and the path it replaced, with a `PostResponse` per
+row followed by FastAPI's second pass for the `response_model`, which
+re-validates the dumped page and renders it with the stdlib json module.
+Reports CPU time per page, and the peak traced memory of one page.
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from collections.abc import Callable, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+import models
+from benchmarks.common import count_posts, create_users, migrate, seed_posts
+from database import AsyncSessionLocal
+from pagination import FEED_ORDER, encode_cursor, paginated_posts_json
+from schemas import PaginatedPostsResponse, PostResponse
+
+
+def _validated_twice(posts: Sequence[models.Post], limit: int) -> bytes:
+    page = PaginatedPostsResponse(
+        posts=[PostResponse.model_validate(post) for post in posts[:limit]],
+        total=None,
+        skip=0,
+        limit=limit,
+        has_more=len(posts) > limit,
+        next_cursor=encode_cursor(posts[limit - 1]) if len(posts) > limit else None,
+    )
+    # What FastAPI does with a model returned for a response_model
+    content = PaginatedPostsResponse.model_validate(page.model_dump()).model_dump(mode="json")
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def _validated_once(posts: Sequence[models.Post], limit: int) -> bytes:
+    return paginated_posts_json(posts, limit=limit, skip=0, total=None)
+
+
+def measure(label: str, serialize: Callable[[], bytes], repeat: int) -> None:
+    serialize()
+    started = time.process_time()
+    for _ in range(repeat):
+        serialize()
+    cpu = (time.process_time() - started) / repeat
+
+    tracemalloc.start()
+    try:
+        serialize()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    print(f"{label:<16} cpu={cpu * 1000:6.2f}ms/page peak={peak / 1024:7.1f}KiB/page")
+
+
+async def main(args: argparse.Namespace) -> None:
+    if await count_posts() < args.limit + 1:
+        await seed_posts(args.limit + 1, await create_users(10))
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(models.Post)
+            .options(selectinload(models.Post.author))
+            .order_by(*FEED_ORDER)
+            .limit(args.limit + 1),
+        )
+        posts = result.scalars().all()
+
+    assert json.loads(_validated_twice(posts, args.limit)) == json.loads(
+        _validated_once(posts, args.limit),
+    ), "serializations differ"
+    print(f"limit={args.limit}, {args.repeat} pages each")
+    measure("validated twice", lambda: _validated_twice(posts, args.limit), args.repeat)
+    measure("validated once", lambda: _validated_once(posts, args.limit), args.repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=1_000)
+    args = parser.parse_args()
+    migrate()
+    asyncio.run(main(args))
@@ -0,0 +1,87 @@
+"""Bytes on the wire for one home page visit, by Accept-Encoding.
+
+Fetches GET / and every `/static/` asset its HTML references, once
+uncompressed, once with gzip and once with `br, gzip` (brotli siblings
+only exist when the optional brotli package is installed). Then repeats
+the visit the way a browser would: immutable assets are not requested
+again and everything else is revalidated with If-None-Match. Counts
+response bodies as sent, headers left out.
+"""
+import argparse
+import asyncio
+import re
+
+import httpx
+
+from benchmarks.common import app_client, count_posts, create_users, migrate, seed_posts
+
+ENCODINGS = ("identity", "gzip", "br, gzip")
+STATIC_URL = re.compile(r"""["'](?:https?://[^/"']+)?(/static/[^"'?#\s,]+)""")
+
+
+def _static_refs(html: str) -> list[str]:
+    # url_for() renders absolute URLs, in attributes and in module imports alike
+    return list(dict.fromkeys(STATIC_URL.findall(html)))
+
+
+async def visit(
+    client: httpx.AsyncClient,
+    encoding: str,
+    cached: dict[str, httpx.Response] | None = None,
+) -> tuple[int, int, dict[str, httpx.Response]]:
+    """Fetch the page and its assets; returns wire bytes, requests and responses."""
+    responses: dict[str, httpx.Response] = {}
+    wire = requests = 0
+
+    async def fetch(url: str) -> httpx.Response:
+        nonlocal wire, requests
+        headers = {"Accept-Encoding": encoding}
+        previous = None if cached is None else cached.get(url)
+        if previous is not None:
+            if "immutable" in previous.headers.get("cache-control", ""):
+                return previous
+            if "etag" in previous.headers:
+                headers["If-None-Match"] = previous.headers["etag"]
+        response = await client.get(url, headers=headers)
+        if response.is_error:
+            response.raise_for_status()
+        requests += 1
+        wire += response.num_bytes_downloaded
+        responses[url] = response
+        return response
+
+    page = await fetch("/")
+    html = page.text if page.status_code == 200 else cached["/"].text
+    for url in _static_refs(html):
+        await fetch(url)
+    return wire, requests, responses
+
+
+async def main(args: argparse.Namespace) -> None:
+    if await count_posts() < args.posts:
+        await seed_posts(args.posts, await create_users(10))
+
+    async with app_client() as client:
+        baseline = None
+        for encoding in ENCODINGS:
+            wire, requests, responses = await visit(client, encoding)
+            baseline = baseline or wire
+            print(
+                f"first visit, {encoding:<8}: {wire:>8} bytes in {requests} requests"
+                f" ({1 - wire / baseline:.0%} saved)",
+            )
+            for url, response in responses.items():
+                print(
+                    f"    {url:<48} {response.num_bytes_downloaded:>7} bytes"
+                    f" {response.headers.get('content-encoding', '')}",
+                )
+        wire, requests, _ = await visit(client, ENCODINGS[-1], cached=responses)
+        print(f"repeat visit, {ENCODINGS[-1]}: {wire:>8} bytes in {requests} requests")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=10)
+    args = parser.parse_args()
+    migrate()
+    asyncio.run(main(args))
@@ -0,0 +1,80 @@
+"""Likes per second on a single hot post, buffered and immediate.
+
+Has `--likes` distinct users like one fresh post through
+POST /api/posts/{id}/like, `--concurrency` at a time, once for each
+`LIKE_DURABILITY`: "buffered", where the accumulator adds the counter
+deltas in batches, and "immediate", where every like updates the post's
+row. After flushing, checks the stored counter matches the likes sent.
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from sqlalchemy import select
+
+import models
+from benchmarks.common import (
+    app_client,
+    bearer,
+    create_users,
+    migrate,
+    register,
+    summarize,
+)
+from config import settings
+from database import AsyncSessionLocal
+from likes import LIKES
+
+
+async def run(client: httpx.AsyncClient, post_id: int, args: argparse.Namespace) -> None:
+    tokens = [bearer(user_id) for user_id in await create_users(args.likes)]
+    slots = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+
+    async def like(headers: dict[str, str]) -> None:
+        async with slots:
+            started = time.perf_counter()
+            (await client.post(f"/api/posts/{post_id}/like", headers=headers)).raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(like(headers) for headers in tokens))
+    elapsed = time.perf_counter() - started
+    await LIKES.flush()
+
+    async with AsyncSessionLocal() as db:
+        stored = (
+            await db.execute(select(models.Post.likes).where(models.Post.id == post_id))
+        ).scalar_one()
+    assert stored == args.likes, f"{stored} likes stored, {args.likes} sent"
+    print(f"  {args.likes / elapsed:.1f} likes/sec")
+    print("  " + summarize("like latency", latencies))
+
+
+async def main(args: argparse.Namespace) -> None:
+    configured = settings.LIKE_DURABILITY
+    async with app_client() as client:
+        _, headers = await register(client)
+        try:
+            for durability in ("buffered", "immediate"):
+                settings.LIKE_DURABILITY = durability
+                response = await client.post(
+                    "/api/posts",
+                    json={"title": "Hot post", "content": "Everyone likes this one."},
+                    headers=headers,
+                )
+                response.raise_for_status()
+                print(f"{durability} ({args.likes} likes, {args.concurrency} concurrent):")
+                await run(client, response.json()["id"], args)
+        finally:
+            settings.LIKE_DURABILITY = configured
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--likes", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+    migrate()
+    asyncio.run(main(args))
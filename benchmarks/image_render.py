@@ -0,0 +1,92 @@
+"""CPU time and peak memory to render one profile picture.
+
+Renders the `populate_images/` samples and synthetic 12MP and 24MP
+photos, as JPEG and PNG, with `render_profile_image` and with a full
+decode at native size as a baseline; the pipeline also encodes the
+width variants. Every render runs alone in a fresh process, which resets
+its peak-RSS mark (VmHWM) first, so the growth reported is the render's
+own. Linux only; needs no database.
+"""
+import argparse
+import multiprocessing
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+from benchmarks.common import synthetic_photo
+from image_utils import PROFILE_IMAGE_SIZE, render_profile_image
+
+SAMPLES_DIR = Path("populate_images")
+
+
+def _mib(field: str) -> float:
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith(f"{field}:"):
+            return int(line.split()[1]) / 1024
+    raise RuntimeError(f"No {field} in /proc/self/status")
+
+
+def _full_decode(source: BytesIO) -> None:
+    # The pipeline before draft() and reduce(): decode everything, then fit
+    with Image.open(source) as original:
+        img = ImageOps.exif_transpose(original).convert("RGB")
+        img = ImageOps.fit(img, PROFILE_IMAGE_SIZE, method=Image.Resampling.LANCZOS)
+        img.save(BytesIO(), "JPEG", quality=85, optimize=True)
+
+
+def _measure(path: Path, full_decode: bool) -> tuple[float, float]:
+    """Render `path`; returns CPU seconds and peak RSS growth in MiB."""
+    source = BytesIO(path.read_bytes())
+    Path("/proc/self/clear_refs").write_text("5")
+    rss_before = _mib("VmRSS")
+    cpu_before = time.process_time()
+    if full_decode:
+        _full_decode(source)
+    else:
+        render_profile_image(source)
+    cpu = time.process_time() - cpu_before
+    return cpu, _mib("VmHWM") - rss_before
+
+
+def _inputs(directory: Path) -> list[Path]:
+    paths = sorted(SAMPLES_DIR.glob("*"))
+    for width, height in ((4000, 3000), (6000, 4000)):
+        jpeg = directory / f"synthetic-{width}x{height}.jpg"
+        jpeg.write_bytes(synthetic_photo(width, height))
+        png = jpeg.with_suffix(".png")
+        Image.open(jpeg).save(png)
+        paths += [jpeg, png]
+    return paths
+
+
+def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        inputs = _inputs(Path(directory))
+        # A fresh process per render, so peaks do not carry over
+        with ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            max_tasks_per_child=1,
+        ) as executor:
+            for path in inputs:
+                with Image.open(path) as image:
+                    label = f"{path.name} ({image.width}x{image.height})"
+                for full_decode in (False, True):
+                    runs = [
+                        executor.submit(_measure, path, full_decode).result()
+                        for _ in range(args.repeat)
+                    ]
+                    cpu = min(cpu for cpu, _ in runs)
+                    peak = max(peak for _, peak in runs)
+                    mode = "full decode" if full_decode else "pipeline   "
+                    print(f"{label:<40} {mode} cpu={cpu * 1000:7.1f}ms peak=+{peak:6.1f}MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,85 @@
+"""Login throughput under concurrent load, with hashing in the pool or inline.
+
+Fires `--logins` password logins at POST /api/users/token, `--concurrency`
+at a time, while one client keeps reading GET /api/posts. Runs twice:
+with Argon2 on the hashing process pool, then on the event loop as it
+ran before the pool existed. Reports logins/sec and the p99 of the
+reads, which shows how long the loop stalls behind each hash.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+import auth
+from benchmarks.common import app_client, migrate, summarize, timed
+
+PASSWORD = "benchmark-password"
+
+
+async def _run_inline(func, *args):
+    # The code path before the pool: hash right on the event loop
+    return func(*args)
+
+
+async def run(client: httpx.AsyncClient, email: str, args: argparse.Namespace) -> None:
+    credentials = {"username": email, "password": PASSWORD}
+    slots = asyncio.Semaphore(args.concurrency)
+    rejected = 0
+
+    async def login() -> None:
+        nonlocal rejected
+        async with slots:
+            response = await client.post("/api/users/token", data=credentials)
+            if response.status_code == 503:
+                rejected += 1
+            else:
+                response.raise_for_status()
+
+    async def read() -> None:
+        (await client.get("/api/posts", params={"limit": 1})).raise_for_status()
+
+    started = time.perf_counter()
+    logins = asyncio.gather(*(login() for _ in range(args.logins)))
+    reads = []
+    while not logins.done():
+        reads.extend(await timed(read, 1))
+    await logins
+    elapsed = time.perf_counter() - started
+    print(f"  {(args.logins - rejected) / elapsed:.1f} logins/sec, {rejected} rejected with 503")
+    print("  " + summarize("reads meanwhile", reads))
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with app_client() as client:
+        name = f"bench{uuid.uuid4().hex[:12]}"
+        email = f"{name}@example.com"
+        response = await client.post(
+            "/api/users",
+            json={"username": name, "email": email, "password": PASSWORD},
+        )
+        response.raise_for_status()
+        # Start the pool's workers before timing anything
+        credentials = {"username": email, "password": PASSWORD}
+        (await client.post("/api/users/token", data=credentials)).raise_for_status()
+
+        print(f"Hashing pool ({args.logins} logins, {args.concurrency} concurrent):")
+        await run(client, email, args)
+        pooled = auth._run_in_hash_pool
+        auth._run_in_hash_pool = _run_inline
+        try:
+            print("Inline on the event loop:")
+            await run(client, email, args)
+        finally:
+            auth._run_in_hash_pool = pooled
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    migrate()
+    asyncio.run(main(args))
@@ -0,0 +1,66 @@
+"""Requests per second for the public pages, with and without the page cache.
+
+Requests the home page, a post page and a user's posts page `--requests`
+times each, `--concurrency` at a time, first with every route's
+`PAGE_CACHE_TTL_SECONDS` at 0, so each hit queries and renders, then with
+the configured TTLs, so all but the first hit are served from the cache.
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from sqlalchemy import select
+
+import models
+from benchmarks.common import app_client, count_posts, create_users, migrate, seed_posts
+from config import settings
+from database import AsyncSessionLocal
+from page_cache import PAGE_CACHE
+
+
+async def run(client: httpx.AsyncClient, url: str, args: argparse.Namespace) -> float:
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def get() -> None:
+        async with slots:
+            (await client.get(url)).raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(get() for _ in range(args.requests)))
+    return args.requests / (time.perf_counter() - started)
+
+
+async def main(args: argparse.Namespace) -> None:
+    if await count_posts() < args.posts:
+        await seed_posts(args.posts, await create_users(10))
+    async with AsyncSessionLocal() as db:
+        post = (await db.execute(select(models.Post).limit(1))).scalar_one()
+
+    urls = {
+        "home": "/",
+        "post_page": f"/posts/{post.id}",
+        "user_posts": f"/users/{post.user_id}/posts",
+    }
+    configured = settings.PAGE_CACHE_TTL_SECONDS
+    async with app_client() as client:
+        for route, url in urls.items():
+            settings.PAGE_CACHE_TTL_SECONDS = {**configured, route: 0}
+            uncached = await run(client, url, args)
+            settings.PAGE_CACHE_TTL_SECONDS = configured
+            PAGE_CACHE.invalidate()
+            cached = await run(client, url, args)
+            print(
+                f"{url:<20} uncached {uncached:7.1f} req/s, cached {cached:7.1f} req/s"
+                f" ({cached / uncached:.1f}x)",
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1_000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    migrate()
+    asyncio.run(main(args))
@@ -0,0 +1,70 @@
+"""Database queries per burst of identical reads, with and without single-flight.
+
+Sends bursts of 1, 8, 32 and 128 simultaneous identical requests to
+GET /api/posts, GET /api/posts/{id} and GET /api/users/{id} and counts
+the statements the engine executes for each burst. Runs once with
+`READ_FLIGHTS` and `VERSION_FLIGHTS` coalescing the reads, then once
+with every request running its own queries.
+"""
+import argparse
+import asyncio
+from collections.abc import Awaitable, Callable
+
+import httpx
+from sqlalchemy import event, select
+
+import models
+from benchmarks.common import app_client, count_posts, create_users, migrate, seed_posts
+from database import AsyncSessionLocal, engine
+from singleflight import READ_FLIGHTS, VERSION_FLIGHTS
+
+
+async def _no_flight(key: object, load: Callable[[], Awaitable[object]]) -> object:
+    return await load()
+
+
+async def burst(client: httpx.AsyncClient, url: str, concurrency: int) -> int:
+    """Send `concurrency` identical GETs at once; returns the queries run."""
+    queries = 0
+
+    def count(*_: object) -> None:
+        nonlocal queries
+        queries += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        responses = await asyncio.gather(*(client.get(url) for _ in range(concurrency)))
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+    for response in responses:
+        response.raise_for_status()
+    return queries
+
+
+async def main(args: argparse.Namespace) -> None:
+    if await count_posts() < args.posts:
+        await seed_posts(args.posts, await create_users(10))
+    async with AsyncSessionLocal() as db:
+        post = (await db.execute(select(models.Post).limit(1))).scalar_one()
+
+    urls = ["/api/posts", f"/api/posts/{post.id}", f"/api/users/{post.user_id}"]
+    async with app_client() as client:
+        for label in ("single-flight", "uncoalesced"):
+            if label == "uncoalesced":
+                READ_FLIGHTS.do = VERSION_FLIGHTS.do = _no_flight
+            print(f"{label}:")
+            for url in urls:
+                counts = [await burst(client, url, n) for n in args.concurrency]
+                per_level = ", ".join(
+                    f"{n}: {count}" for n, count in zip(args.concurrency, counts, strict=True)
+                )
+                print(f"  {url:<18} queries per burst of {per_level}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    args = parser.parse_args()
+    migrate()
+    asyncio.run(main(args))
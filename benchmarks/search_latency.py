@@ -0,0 +1,117 @@
+"""Search latency over a million-post corpus, per backend.
+
+Seeds up to `--posts` posts whose words follow a Zipf-like distribution
+over a synthetic vocabulary, then times the first and second page of a
+common word, a rare word, a prefix and a two-word query with each search
+backend: the database's (SQLite FTS5 or Postgres tsvector) and the
+in-memory inverted index. Seeding bypasses the write handlers, so the
+FTS5 table is rebuilt from the posts table when it is behind. Only the
+memory backend expands `word*` prefixes; the database backends search
+the word itself.
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+
+from sqlalchemy import text
+
+from benchmarks.common import (
+    count_posts,
+    create_users,
+    migrate,
+    seed_posts,
+    summarize,
+)
+from config import settings
+from database import AsyncSessionLocal
+from search import MEMORY_SEARCH, encode_search_cursor, search_posts
+
+SYLLABLES = ("ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "pa", "qu", "do")
+# 1,728 three-syllable words, ranked by how often they are drawn
+VOCABULARY = ["".join(parts) for parts in itertools.product(SYLLABLES, repeat=3)]
+WORDS_PER_POST = 40
+
+
+def _content(rng: random.Random, weights: list[float]) -> str:
+    return " ".join(rng.choices(VOCABULARY, cum_weights=weights, k=WORDS_PER_POST))
+
+
+async def _rebuild_fts() -> None:
+    async with AsyncSessionLocal() as db:
+        if db.get_bind().dialect.name != "sqlite":
+            return
+        indexed = (await db.execute(text("SELECT count(*) FROM posts_fts"))).scalar_one()
+        if indexed >= await count_posts():
+            return
+        print("Rebuilding posts_fts...")
+        await db.execute(text("DELETE FROM posts_fts"))
+        await db.execute(
+            text("INSERT INTO posts_fts (rowid, title, content) SELECT id, title, content FROM posts"),
+        )
+        await db.commit()
+
+
+async def timed_search(query: str, repeat: int) -> tuple[list[float], list[float], int]:
+    """Time the first two pages of `query`; returns both timings and the first page's size."""
+    first: list[float] = []
+    second: list[float] = []
+    async with AsyncSessionLocal() as db:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            page = await search_posts(db, query, 11)
+            first.append(time.perf_counter() - started)
+            if len(page) > 10:
+                post_id, score = page[9]
+                started = time.perf_counter()
+                await search_posts(db, query, 11, encode_search_cursor(score, post_id))
+                second.append(time.perf_counter() - started)
+    return first, second, len(page[:10])
+
+
+async def main(args: argparse.Namespace) -> None:
+    existing = await count_posts()
+    if existing < args.posts:
+        print(f"Seeding {args.posts - existing} posts...")
+        rng = random.Random(0)
+        weights = list(itertools.accumulate(1 / rank for rank in range(1, len(VOCABULARY) + 1)))
+        await seed_posts(
+            args.posts - existing,
+            await create_users(100),
+            content=lambda _: _content(rng, weights),
+        )
+    await _rebuild_fts()
+
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        await MEMORY_SEARCH.sync(db)
+    print(f"Memory index built in {time.perf_counter() - started:.1f}s")
+
+    queries = {
+        "common": VOCABULARY[0],
+        "rare": VOCABULARY[-1],
+        "prefix": f"{VOCABULARY[0][:4]}*",
+        "two words": f"{VOCABULARY[10]} {VOCABULARY[100]}",
+    }
+    configured = settings.SEARCH_BACKEND
+    try:
+        for backend in ("database", "memory"):
+            settings.SEARCH_BACKEND = backend
+            print(f"{backend}:")
+            for label, query in queries.items():
+                first, second, found = await timed_search(query, args.repeat)
+                print(f"  {label} {query!r}, {found} on the first page")
+                print("    " + summarize("page 1", first))
+                print("    " + summarize("page 2", second))
+    finally:
+        settings.SEARCH_BACKEND = configured
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    migrate()
+    asyncio.run(main(args))
@@ -0,0 +1,76 @@
+"""Profile picture upload latency at 1, 8 and 32 concurrent uploads.
+
+Each concurrent client is its own user and uploads `--uploads` synthetic
+12MP photos back to back through PATCH /api/users/{id}/picture. Reports
+the latency percentiles of each level, with uploads the image pool
+turned away (503) counted apart.
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.common import (
+    app_client,
+    bearer,
+    create_users,
+    migrate,
+    summarize,
+    synthetic_photo,
+)
+
+
+async def run(
+    client: httpx.AsyncClient,
+    user_ids: list[int],
+    photos: list[bytes],
+    uploads: int,
+) -> str:
+    latencies: list[float] = []
+    rejected = 0
+
+    async def uploader(user_id: int) -> None:
+        nonlocal rejected
+        headers = bearer(user_id)
+        for i in range(uploads):
+            started = time.perf_counter()
+            response = await client.patch(
+                f"/api/users/{user_id}/picture",
+                files={"file": ("photo.jpg", photos[(user_id + i) % len(photos)], "image/jpeg")},
+                headers=headers,
+            )
+            if response.status_code == 503:
+                rejected += 1
+                continue
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(uploader(user_id) for user_id in user_ids))
+    elapsed = time.perf_counter() - started
+    return (
+        summarize(f"{len(user_ids):>2} concurrent", latencies)
+        + f" {len(latencies) / elapsed:.1f} uploads/sec, {rejected} rejected with 503"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    photos = [synthetic_photo(4000, 3000, seed) for seed in range(8)]
+    user_ids = await create_users(max(args.concurrency))
+    async with app_client() as client:
+        # Start the image workers, so their startup is not counted
+        await run(client, user_ids[:1], photos, 1)
+        for concurrency in args.concurrency:
+            print(await run(client, user_ids[:concurrency], photos, args.uploads))
+        for user_id in user_ids:
+            await client.delete(f"/api/users/{user_id}/picture", headers=bearer(user_id))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--uploads", type=int, default=5)
+    args = parser.parse_args()
+    migrate()
+    asyncio.run(main(args))
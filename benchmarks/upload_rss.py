@@ -0,0 +1,82 @@
+"""Peak memory per profile picture upload.
+
+Uploads synthetic photos of a few sizes, and one body over
+`MAX_UPLOAD_SIZE_BYTES`, to PATCH /api/users/{id}/picture. Before each
+upload it resets the kernel's peak-RSS mark (VmHWM) of the server process
+and of the image workers, and reads it back afterwards: the server's
+growth over its resident size, and each worker's whole peak. Linux only.
+"""
+import argparse
+import asyncio
+import os
+from pathlib import Path
+
+import image_utils
+from benchmarks.common import app_client, migrate, register, synthetic_photo
+from config import settings
+
+
+def _pids() -> list[int]:
+    executor = image_utils._image_executor
+    workers = [] if executor is None else list(executor._processes)
+    return [os.getpid(), *workers]
+
+
+def _reset_peaks(pids: list[int]) -> None:
+    for pid in pids:
+        Path(f"/proc/{pid}/clear_refs").write_text("5")
+
+
+def _mib(pid: int, field: str) -> float:
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith(f"{field}:"):
+            return int(line.split()[1]) / 1024
+    raise RuntimeError(f"No {field} for process {pid}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    uploads = {
+        f"{width}x{height} JPEG": synthetic_photo(width, height, seed)
+        for seed, (width, height) in enumerate(((1600, 1200), (4000, 3000), (6000, 4000)))
+    }
+    uploads["oversized body"] = os.urandom(settings.MAX_UPLOAD_SIZE_BYTES * 4)
+
+    async with app_client() as client:
+        user_id, headers = await register(client)
+
+        async def upload(data: bytes) -> int:
+            response = await client.patch(
+                f"/api/users/{user_id}/picture",
+                files={"file": ("upload.jpg", data, "image/jpeg")},
+                headers=headers,
+            )
+            return response.status_code
+
+        # Start the image workers, so their startup is not counted
+        await upload(synthetic_photo(640, 480))
+
+        for label, data in uploads.items():
+            pids = _pids()
+            growth: list[float] = []
+            worker_peaks: list[float] = []
+            for _ in range(args.repeat):
+                _reset_peaks(pids)
+                before = _mib(pids[0], "VmRSS")
+                status = await upload(data)
+                growth.append(_mib(pids[0], "VmHWM") - before)
+                worker_peaks.extend(_mib(pid, "VmHWM") for pid in pids[1:])
+            print(
+                f"{label} ({len(data) / 2**20:.1f} MiB) -> {status}:"
+                f" server peak +{max(growth):.1f} MiB over its RSS,"
+                f" image worker peak {max(worker_peaks, default=0.0):.0f} MiB",
+            )
+
+        (await client.delete(f"/api/users/{user_id}/picture", headers=headers)).raise_for_status()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    migrate()
+    asyncio.run(main(args))
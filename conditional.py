@@ -0,0 +1,66 @@
+import hashlib
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any
+
+from fastapi import Request, Response, status
+
+
+def make_etag(*parts: Any) -> str:
+    """Build a weak ETag from the version columns behind a response.
+
+    Weak, because GZipMiddleware may re-encode the body on the way out.
+    """
+    digest = hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+    return f'W/"{digest}"'
+
+
+def latest(timestamps: Iterable[datetime | None]) -> datetime | None:
+    values = [
+        value if value.tzinfo else value.replace(tzinfo=UTC)
+        for value in timestamps
+        if value is not None
+    ]
+    return max(values, default=None)
+
+
+def validator_headers(etag: str, last_modified: datetime | None = None) -> dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+
+def _weak_match(etag: str, candidate: str) -> bool:
+    return etag.removeprefix("W/") == candidate.strip().removeprefix("W/")
+
+
+def not_modified(
+    request: Request,
+    etag: str,
+    last_modified: datetime | None = None,
+) -> Response | None:
+    """Return a 304 response if the client's validators still match."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        matched = if_none_match.strip() == "*" or any(
+            _weak_match(etag, candidate) for candidate in if_none_match.split(",")
+        )
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is None or last_modified is None:
+            return None
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return None
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=UTC)
+        matched = last_modified.replace(microsecond=0) <= since
+    if not matched:
+        return None
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers=validator_headers(etag, last_modified),
+    )
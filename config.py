@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -10,11 +12,55 @@ class Settings(BaseSettings):
     SECRET_KEY: SecretStr
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # Per-process; other workers see a user change after at most the TTL
+    USER_CACHE_SIZE: int = 10_000
+    USER_CACHE_TTL_SECONDS: float = 60
+
+    TOKEN_CACHE_SIZE: int = 10_000
     
     MAX_UPLOAD_SIZE_BYTES: int = 5 * 1024 * 1024    # 5 MB
 
+    IMAGE_WORKERS: int = 2
+    IMAGE_MAX_CONCURRENCY: int = 4
+    IMAGE_PROCESS_TIMEOUT_SECONDS: float = 15
+
+    GZIP_MINIMUM_SIZE: int = 1024
+
     POSTS_PER_PAGE: int = 10
 
+    # Seconds a rendered page stays fresh, by route name; 0 disables caching
+    PAGE_CACHE_TTL_SECONDS: dict[str, float] = {
+        "home": 15,
+        "post_page": 60,
+        "user_posts": 30,
+    }
+    PAGE_CACHE_STALE_SECONDS: float = 30
+    PAGE_CACHE_SIZE: int = 1_000
+    POST_COUNT_MODE: Literal["exact", "counter", "estimate"] = "exact"
+
+    # "buffered" batches likes in memory and may lose the last interval's
+    # worth on a crash; "immediate" writes every like through
+    LIKE_DURABILITY: Literal["buffered", "immediate"] = "buffered"
+    LIKE_FLUSH_INTERVAL_SECONDS: float = 1.0
+    LIKED_POSTS_CACHE_SIZE: int = 10_000
+    LIKED_POSTS_CACHE_TTL_SECONDS: float = 60
+
+    TRENDING_SIZE: int = 100
+    TRENDING_HALF_LIFE_HOURS: float = 6
+    TRENDING_WINDOW_HOURS: float = 48
+    TRENDING_REFRESH_SECONDS: float = 30
+    TRENDING_REBUILD_SECONDS: float = 3600
+
+    # "memory" keeps an in-process index instead of the database's own
+    # full-text search; meant for a single node
+    SEARCH_BACKEND: Literal["database", "memory"] = "database"
+    SEARCH_SNAPSHOT_PATH: str = "search_index.json"
+    SEARCH_SYNC_SECONDS: float = 10
+
     RESET_TOKEN_EXPIRE_MINUTES: int = 60
 
     MAIL_SERVER: str = "localhost"
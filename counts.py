@@ -0,0 +1,124 @@
+from sqlalchemy import delete, func, literal, select, text, true, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from config import settings
+from database import AsyncSessionLocal
+
+ALL_POSTS_KEY = "all"
+
+
+def _dialect_name(db: AsyncSession) -> str:
+    return db.get_bind().dialect.name
+
+
+def _counter_key(user_id: int | None) -> str:
+    return ALL_POSTS_KEY if user_id is None else f"user:{user_id}"
+
+
+async def _exact_count(db: AsyncSession, user_id: int | None) -> int:
+    query = select(func.count()).select_from(models.Post)
+    if user_id is not None:
+        query = query.where(models.Post.user_id == user_id)
+    result = await db.execute(query)
+    return result.scalar() or 0
+
+
+async def _counter_count(db: AsyncSession, user_id: int | None) -> int:
+    key = _counter_key(user_id)
+    result = await db.execute(
+        select(models.PostCount.value).where(models.PostCount.key == key),
+    )
+    value = result.scalar()
+    if value is not None:
+        return value
+    return await _seed_counter(key, user_id)
+
+
+async def _seed_counter(key: str, user_id: int | None) -> int:
+    """Create a missing counter from an exact count and return its value.
+
+    Runs in a transaction of its own, so a read never commits the caller's
+    session. The count and the insert must not miss a post whose creator
+    already found the counter missing: SQLite runs the INSERT ... SELECT
+    under its database-wide write lock, and Postgres first waits out every
+    transaction that has adjusted counters and holds off new ones.
+    """
+    counted = select(literal(key), func.count()).select_from(models.Post)
+    if user_id is not None:
+        counted = counted.where(models.Post.user_id == user_id)
+    else:
+        # SQLite needs a WHERE to tell INSERT ... SELECT apart from its
+        # upsert clause
+        counted = counted.where(true())
+
+    async with AsyncSessionLocal() as db, db.begin():
+        postgres = _dialect_name(db) == "postgresql"
+        if postgres:
+            await db.execute(text("LOCK TABLE post_counts IN SHARE ROW EXCLUSIVE MODE"))
+        insert = pg_insert if postgres else sqlite_insert
+        await db.execute(
+            insert(models.PostCount)
+            .from_select(["key", "value"], counted)
+            .on_conflict_do_nothing(index_elements=["key"]),
+        )
+        result = await db.execute(
+            select(models.PostCount.value).where(models.PostCount.key == key),
+        )
+        return result.scalar_one()
+
+
+async def _estimated_count(db: AsyncSession, user_id: int | None) -> int:
+    # Only Postgres keeps a table-level row estimate; per-author counts are
+    # a range read of ix_posts_user_id_date_posted_id and stay exact.
+    if user_id is None and _dialect_name(db) == "postgresql":
+        result = await db.execute(
+            text("SELECT reltuples FROM pg_class WHERE relname = :table"),
+            {"table": models.Post.__tablename__},
+        )
+        estimate = result.scalar()
+        # reltuples is -1 until the table has been vacuumed or analyzed
+        if estimate is not None and estimate >= 0:
+            return int(estimate)
+    return await _exact_count(db, user_id)
+
+
+async def count_posts(db: AsyncSession, user_id: int | None = None) -> int:
+    """Count all posts, or one author's posts, using `POST_COUNT_MODE`."""
+    if settings.POST_COUNT_MODE == "counter":
+        return await _counter_count(db, user_id)
+    if settings.POST_COUNT_MODE == "estimate":
+        return await _estimated_count(db, user_id)
+    return await _exact_count(db, user_id)
+
+
+async def adjust_post_count(db: AsyncSession, user_id: int, delta: int) -> None:
+    """Apply a post create/delete to the counter table in the caller's transaction.
+
+    Counters that have not been seeded yet are left alone; they are seeded
+    from an exact count on their first read.
+    """
+    if settings.POST_COUNT_MODE != "counter":
+        return
+    await db.execute(
+        update(models.PostCount)
+        .where(models.PostCount.key.in_([ALL_POSTS_KEY, _counter_key(user_id)]))
+        .values(value=models.PostCount.value + delta),
+    )
+
+
+async def discard_user_count(db: AsyncSession, user_id: int) -> None:
+    """Drop an author's counter before their posts are cascade-deleted."""
+    if settings.POST_COUNT_MODE != "counter":
+        return
+    removed = await _exact_count(db, user_id)
+    await db.execute(
+        update(models.PostCount)
+        .where(models.PostCount.key == ALL_POSTS_KEY)
+        .values(value=models.PostCount.value - removed),
+    )
+    await db.execute(
+        delete(models.PostCount).where(models.PostCount.key == _counter_key(user_id)),
+    )
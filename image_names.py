@@ -0,0 +1,15 @@
+"""File names of stored profile images.
+
+Kept free of Pillow and the image worker pool, so the models (and the
+migrations that import them) can build image URLs without loading either.
+"""
+import hashlib
+from pathlib import Path
+
+
+def profile_image_filename(data: bytes) -> str:
+    return f"{hashlib.sha256(data).hexdigest()[:32]}.jpg"
+
+
+def variant_filename(filename: str, width: int) -> str:
+    return f"{Path(filename).stem}-{width}.webp"
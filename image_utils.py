@@ -1,34 +1,222 @@
+import asyncio
+import contextlib
+import multiprocessing
+import os
+import shutil
+import tempfile
 import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
 from pathlib import Path
+from typing import BinaryIO
+from weakref import WeakValueDictionary
 
 from PIL import Image, ImageOps
+from starlette.concurrency import run_in_threadpool
 
+from config import settings
+from image_names import profile_image_filename, variant_filename
 
 PROFILE_PICS_DIR = Path("media/profile_pics")
 
+PROFILE_IMAGE_SIZE = (300, 300)
+# Shrink no further than twice the output size before the final LANCZOS
+# pass, so the fast decode and reduce() steps never cost visible sharpness.
+PROFILE_DECODE_SIZE = (PROFILE_IMAGE_SIZE[0] * 2, PROFILE_IMAGE_SIZE[1] * 2)
+# Feed avatars render at 64 CSS pixels; 128 covers 2x displays
+PROFILE_VARIANT_WIDTHS = (64, 128, 300)
 
-def process_profile_image(content: bytes) -> str:
-    with Image.open(BytesIO(content)) as original:
-        img = ImageOps.exif_transpose(original)
-        img = ImageOps.fit(img, (300, 300), method=Image.Resampling.LANCZOS)
+_image_executor: ProcessPoolExecutor | None = None
+_image_slots = asyncio.Semaphore(settings.IMAGE_MAX_CONCURRENCY)
+_image_locks: WeakValueDictionary[str, asyncio.Lock] = WeakValueDictionary()
 
-        if img.mode in ("RGBA", "LA", "P"):
-            img = img.convert("RGB")
 
-        filename = f"{uuid.uuid4().hex}.jpg"
-        filepath = PROFILE_PICS_DIR /filename
+def _decode_near(original: Image.Image, size: tuple[int, int]) -> Image.Image:
+    """Decode `original` at the smallest cheap scale that still covers `size`."""
+    if original.format == "JPEG":
+        # Let libjpeg decode straight at 1/2, 1/4 or 1/8 scale
+        original.draft("RGB", size)
 
-        PROFILE_PICS_DIR.mkdir(parents=True, exist_ok=True)
+    img = ImageOps.exif_transpose(original)
 
-        img.save(filepath, "JPEG", quality=85, optimize=True)
-    
-    return filename
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
+    factor = min(img.width // size[0], img.height // size[1])
+    if factor >= 2:
+        img = img.reduce(factor)
+    return img
+
+
+def render_profile_image(source: BinaryIO) -> tuple[bytes, dict[int, bytes]]:
+    """Render an upload as the 300x300 JPEG plus one WebP per variant width."""
+    with Image.open(source) as original:
+        img = _decode_near(original, PROFILE_DECODE_SIZE)
+        img = ImageOps.fit(img, PROFILE_IMAGE_SIZE, method=Image.Resampling.LANCZOS)
+
+        output = BytesIO()
+        img.save(output, "JPEG", quality=85, optimize=True)
+
+        variants: dict[int, bytes] = {}
+        for width in PROFILE_VARIANT_WIDTHS:
+            variant = img
+            if width != img.width:
+                variant = img.resize((width, width), Image.Resampling.LANCZOS)
+            variant_output = BytesIO()
+            variant.save(variant_output, "WEBP", quality=80, method=6)
+            variants[width] = variant_output.getvalue()
+
+    return output.getvalue(), variants
+
+
+def _write_once(filepath: Path, data: bytes) -> None:
+    if filepath.exists():
+        return
+    # Write under a unique name and rename into place, so concurrent saves of
+    # the same content never expose a partially written file.
+    tmp_path = filepath.with_name(f".{uuid.uuid4().hex}.tmp")
+    tmp_path.write_bytes(data)
+    tmp_path.replace(filepath)
+
+
+def profile_image_lock(filename: str) -> asyncio.Lock:
+    """The lock serializing the save and release of one stored picture.
+
+    Hold it from saving a picture until the user row referring to it is
+    committed, and from counting a picture's users until its files are
+    deleted, so a release never deletes a picture an upload just stored.
+    Per process, like the render pool.
+    """
+    lock = _image_locks.get(filename)
+    if lock is None:
+        lock = _image_locks[filename] = asyncio.Lock()
+    return lock
+
+
+def save_profile_image(data: bytes, variants: dict[int, bytes]) -> tuple[str, list[int]]:
+    """Store a rendered image under the hash of its content.
+
+    Identical renders map to the same files, so a picture that is already
+    stored is not written again.
+    """
+    filename = profile_image_filename(data)
+    filepath = PROFILE_PICS_DIR /filename
+
+    PROFILE_PICS_DIR.mkdir(parents=True, exist_ok=True)
+
+    _write_once(filepath, data)
+    for width, variant in variants.items():
+        _write_once(PROFILE_PICS_DIR / variant_filename(filename, width), variant)
+
+    return filename, sorted(variants)
+
+
+def _render_profile_image_file(path: str) -> tuple[bytes, dict[int, bytes]]:
+    with open(path, "rb") as source:
+        return render_profile_image(source)
+
+
+def _copy_upload(upload: BinaryIO, path: str) -> None:
+    with open(path, "wb") as tmp:
+        shutil.copyfileobj(upload, tmp)
+
+
+def _end_job(loop: asyncio.AbstractEventLoop, path: str) -> None:
+    os.unlink(path)
+    # The loop is gone if the server shut down while the job ran
+    with contextlib.suppress(RuntimeError):
+        loop.call_soon_threadsafe(_image_slots.release)
+
+
+def _image_pool() -> ProcessPoolExecutor:
+    global _image_executor
+    if _image_executor is None:
+        # Spawn rather than fork: the server process already runs threads
+        _image_executor = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _image_executor
+
+
+def _discard_image_pool(executor: ProcessPoolExecutor) -> None:
+    """Drop a pool whose worker died, so the next upload starts a fresh one."""
+    global _image_executor
+    if _image_executor is executor:
+        _image_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def render_profile_image_in_pool(upload: BinaryIO) -> tuple[bytes, dict[int, bytes]]:
+    """Render an upload in the image worker pool.
+
+    Returns the JPEG and the WebP variants by width, for
+    `store_profile_image`. The upload is streamed into a temporary file
+    for the worker to read, rather than read into bytes and pickled over.
+
+    At most `IMAGE_MAX_CONCURRENCY` renders per server process run in the
+    pool at once; the rest wait here. Raises `TimeoutError` if rendering
+    takes longer than `IMAGE_PROCESS_TIMEOUT_SECONDS`, and `BrokenProcessPool`
+    if a worker died, e.g. killed for memory; the pool is replaced for the
+    next upload then.
+    """
+    await _image_slots.acquire()
+    executor = _image_pool()
+    fd, path = tempfile.mkstemp(prefix="upload-")
+    os.close(fd)
+    try:
+        await run_in_threadpool(_copy_upload, upload, path)
+        future = executor.submit(_render_profile_image_file, path)
+    except BaseException as err:
+        os.unlink(path)
+        _image_slots.release()
+        if isinstance(err, BrokenProcessPool):
+            _discard_image_pool(executor)
+        raise
+    # A worker cannot be interrupted, so a render that times out keeps its
+    # slot and its file until it actually finishes
+    loop = asyncio.get_running_loop()
+    future.add_done_callback(lambda _: _end_job(loop, path))
+    try:
+        # Cancelling the wrapper (timeout or client disconnect) also cancels
+        # the job if a worker has not picked it up yet.
+        return await asyncio.wait_for(
+            asyncio.wrap_future(future),
+            timeout=settings.IMAGE_PROCESS_TIMEOUT_SECONDS,
+        )
+    except BrokenProcessPool:
+        _discard_image_pool(executor)
+        raise
+
+
+async def store_profile_image(data: bytes, variants: dict[int, bytes]) -> tuple[str, list[int]]:
+    """Save a render off the event loop; see `save_profile_image`.
+
+    Returns the JPEG's filename and the widths of the WebP variants saved
+    next to it. Call it holding `profile_image_lock` for that filename.
+    """
+    return await run_in_threadpool(save_profile_image, data, variants)
+
+
+def shutdown_image_executor() -> None:
+    global _image_executor
+    if _image_executor is not None:
+        _image_executor.shutdown(cancel_futures=True)
+        _image_executor = None
 
 
 def delete_profile_image(filename: str | None) -> None:
+    """Unlink a stored picture and its variants.
+
+    Files are shared by every user with the same picture; only call this
+    once no `User.image_file` refers to `filename` any more, holding
+    `profile_image_lock` for it.
+    """
     if filename is None:
         return
     filepath = PROFILE_PICS_DIR / filename
     if filepath.exists():
-        filepath.unlink()
\ No newline at end of file
+        filepath.unlink()
+    for variant in PROFILE_PICS_DIR.glob(f"{Path(filename).stem}-*.webp"):
+        variant.unlink()
@@ -0,0 +1,199 @@
+import heapq
+import math
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Any
+
+_QUERY_RE = re.compile(r"(\w+)(\*?)")
+_WORD_RE = re.compile(r"\w+")
+
+# Highest code point, so every term starting with a prefix sorts below
+# prefix + _LAST_CHAR
+_LAST_CHAR = "\U0010ffff"
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip diacritics, like FTS5's unicode61 tokenizer."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> list[str]:
+    return _WORD_RE.findall(fold(text))
+
+
+class Postings:
+    """The documents a term occurs in, with its frequency in each.
+
+    Held as two parallel machine-typed arrays ordered by document id.
+    """
+
+    __slots__ = ("doc_ids", "freqs")
+
+    def __init__(self) -> None:
+        self.doc_ids = array("q")
+        self.freqs = array("I")
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def add(self, doc_id: int, freq: int) -> None:
+        # New posts have the highest ids, so this is almost always an append
+        i = bisect_left(self.doc_ids, doc_id)
+        if i < len(self.doc_ids) and self.doc_ids[i] == doc_id:
+            self.freqs[i] = freq
+        else:
+            self.doc_ids.insert(i, doc_id)
+            self.freqs.insert(i, freq)
+
+    def remove(self, doc_id: int) -> None:
+        i = bisect_left(self.doc_ids, doc_id)
+        if i < len(self.doc_ids) and self.doc_ids[i] == doc_id:
+            del self.doc_ids[i]
+            del self.freqs[i]
+
+
+class InvertedIndex:
+    """In-memory full-text index over (title, content) documents.
+
+    Queries match documents holding every word, and a word ending in `*`
+    matches any term it prefixes. Results are ranked with BM25, with title
+    words counted `title_weight` times. All operations are synchronous, so
+    an index can be shared by the tasks of one event loop without locking.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, title_weight: int = 2) -> None:
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight
+        self._postings: dict[str, Postings] = {}
+        # Every indexed term in sorted order, for prefix lookups
+        self._terms: list[str] = []
+        self._doc_terms: dict[int, tuple[str, ...]] = {}
+        self._doc_lengths: dict[int, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def doc_ids(self) -> set[int]:
+        return set(self._doc_lengths)
+
+    def add(self, doc_id: int, title: str, content: str) -> None:
+        """Index a document, replacing any earlier version of it."""
+        self.remove(doc_id)
+        counts = Counter(tokenize(content))
+        for term in tokenize(title):
+            counts[term] += self.title_weight
+        for term, freq in counts.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = Postings()
+                insort(self._terms, term)
+            postings.add(doc_id, freq)
+        length = sum(counts.values())
+        self._doc_terms[doc_id] = tuple(counts)
+        self._doc_lengths[doc_id] = length
+        self._total_length += length
+
+    def remove(self, doc_id: int) -> None:
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        for term in terms:
+            postings = self._postings[term]
+            postings.remove(doc_id)
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+
+    def to_dict(self) -> dict[str, Any]:
+        """The index as plain lists and dicts, ready for JSON; see `from_dict`."""
+        return {
+            "k1": self.k1,
+            "b": self.b,
+            "title_weight": self.title_weight,
+            # Documents without any term have no postings to appear in
+            "doc_ids": sorted(self._doc_lengths),
+            "postings": {
+                term: [postings.doc_ids.tolist(), postings.freqs.tolist()]
+                for term, postings in self._postings.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "InvertedIndex":
+        """Rebuild an index saved with `to_dict`.
+
+        Raises ValueError, TypeError or KeyError when `data` is malformed.
+        """
+        index = cls(data["k1"], data["b"], data["title_weight"])
+        index._doc_lengths = dict.fromkeys(data["doc_ids"], 0)
+        doc_terms: dict[int, list[str]] = {doc_id: [] for doc_id in index._doc_lengths}
+        for term, (doc_ids, freqs) in data["postings"].items():
+            if not doc_ids or len(doc_ids) != len(freqs) or doc_ids != sorted(doc_ids):
+                raise ValueError(f"Malformed postings for {term!r}")
+            postings = index._postings[term] = Postings()
+            postings.doc_ids.extend(doc_ids)
+            postings.freqs.extend(freqs)
+            for doc_id, freq in zip(doc_ids, freqs):
+                doc_terms[doc_id].append(term)
+                index._doc_lengths[doc_id] += freq
+        index._terms = sorted(index._postings)
+        index._doc_terms = {doc_id: tuple(terms) for doc_id, terms in doc_terms.items()}
+        index._total_length = sum(index._doc_lengths.values())
+        return index
+
+    def _expand(self, word: str, prefix: bool) -> list[str]:
+        if not prefix:
+            return [word] if word in self._postings else []
+        start = bisect_left(self._terms, word)
+        end = bisect_left(self._terms, word + _LAST_CHAR, start)
+        return self._terms[start:end]
+
+    def _word_scores(self, word: str, prefix: bool) -> dict[int, float]:
+        count = len(self._doc_lengths)
+        average_length = self._total_length / count
+        scores: dict[int, float] = {}
+        for term in self._expand(word, prefix):
+            postings = self._postings[term]
+            df = len(postings)
+            idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+            for doc_id, freq in zip(postings.doc_ids, postings.freqs):
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+        return scores
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        after: tuple[float, int] | None = None,
+    ) -> list[tuple[int, float]]:
+        """Return up to `limit` `(doc_id, score)` pairs, best first.
+
+        `after` is the (score, doc_id) of the last result of the previous
+        page; only results ranking below it are returned.
+        """
+        words = _QUERY_RE.findall(fold(query))
+        if not words or not self._doc_lengths:
+            return []
+        (word, star), *rest = words
+        scores = self._word_scores(word, bool(star))
+        for word, star in rest:
+            if not scores:
+                return []
+            word_scores = self._word_scores(word, bool(star))
+            scores = {
+                doc_id: score + word_scores[doc_id]
+                for doc_id, score in scores.items()
+                if doc_id in word_scores
+            }
+        ranked = ((score, doc_id) for doc_id, score in scores.items())
+        if after is not None:
+            ranked = (key for key in ranked if key < after)
+        return [(doc_id, score) for score, doc_id in heapq.nlargest(limit, ranked)]
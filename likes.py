@@ -0,0 +1,188 @@
+import asyncio
+import contextlib
+import logging
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable
+
+from sqlalchemy import bindparam, delete, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from cache import TTLCache
+from config import settings
+from database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+_posts = models.Post.__table__
+# Leaves updated_at alone: like counts are not part of the responses its
+# validators cover, so a busy post's ETags stay stable between edits.
+_ADD_LIKES = (
+    update(_posts)
+    .where(_posts.c.id == bindparam("post_id"))
+    .values(likes=_posts.c.likes + bindparam("delta"), updated_at=_posts.c.updated_at)
+)
+
+
+class LikeAccumulator:
+    """Write-behind buffer for post like counts.
+
+    Likes and unlikes only adjust an in-memory delta per post; `flush`
+    writes the deltas out as one batched UPDATE, so a popular post costs a
+    single row update per interval instead of one per click. Deltas not
+    yet flushed are lost if the process dies.
+    """
+
+    def __init__(self) -> None:
+        self._deltas: dict[int, int] = {}
+        self._flush_lock = asyncio.Lock()
+
+    def add(self, post_id: int, delta: int) -> None:
+        pending = self._deltas.get(post_id, 0) + delta
+        if pending:
+            self._deltas[post_id] = pending
+        else:
+            self._deltas.pop(post_id, None)
+
+    def pending(self, post_id: int) -> int:
+        return self._deltas.get(post_id, 0)
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self._deltas:
+                return
+            deltas, self._deltas = self._deltas, {}
+            # Ascending ids, so concurrent flushes from other workers take
+            # the row locks in the same order
+            params = [
+                {"post_id": post_id, "delta": delta}
+                for post_id, delta in sorted(deltas.items())
+            ]
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(_ADD_LIKES, params)
+                    await db.commit()
+            except BaseException:
+                for post_id, delta in deltas.items():
+                    self.add(post_id, delta)
+                raise
+
+    async def run(self, interval: float) -> None:
+        """Flush every `interval` seconds until cancelled, then once more."""
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.flush()
+                except Exception:
+                    logger.exception("Flushing like counts failed, retrying next interval")
+        finally:
+            with contextlib.suppress(Exception):
+                await self.flush()
+
+
+LIKES = LikeAccumulator()
+
+
+class PostIdSet:
+    """Immutable set of post ids, held as a sorted array of 64-bit ints.
+
+    Eight bytes per id, several times less than a set of ints needs, so
+    the liked posts of many users fit in memory at once. Lookups bisect.
+    """
+
+    __slots__ = ("_ids",)
+
+    def __init__(self, post_ids: Iterable[int]) -> None:
+        self._ids = array("q", sorted(post_ids))
+
+    def __contains__(self, post_id: int) -> bool:
+        ids = self._ids
+        i = bisect_left(ids, post_id)
+        return i < len(ids) and ids[i] == post_id
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+# Per-process; a like made through another worker shows up here once the
+# entry expires
+LIKED_POSTS: TTLCache[int, PostIdSet] = TTLCache(
+    settings.LIKED_POSTS_CACHE_SIZE,
+    settings.LIKED_POSTS_CACHE_TTL_SECONDS,
+)
+
+
+async def liked_post_ids(db: AsyncSession, user_id: int) -> PostIdSet:
+    """The posts `user_id` has liked, from LIKED_POSTS or one index scan."""
+    liked = LIKED_POSTS.get(user_id)
+    if liked is None:
+        result = await db.execute(
+            select(models.PostLike.post_id).where(models.PostLike.user_id == user_id),
+        )
+        liked = PostIdSet(result.scalars())
+        LIKED_POSTS.set(user_id, liked)
+    return liked
+
+
+async def set_liked(db: AsyncSession, user_id: int, post_id: int, liked: bool) -> bool:
+    """Like or unlike a post for a user and commit.
+
+    Returns whether anything changed; liking twice or unliking a post that
+    was never liked leaves the count alone. The like itself is stored right
+    away, while the post's counter follows `LIKE_DURABILITY`.
+    """
+    if liked:
+        insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+        result = await db.execute(
+            insert(models.PostLike)
+            .values(user_id=user_id, post_id=post_id)
+            .on_conflict_do_nothing(index_elements=["user_id", "post_id"]),
+        )
+    else:
+        result = await db.execute(
+            delete(models.PostLike).where(
+                models.PostLike.user_id == user_id,
+                models.PostLike.post_id == post_id,
+            ),
+        )
+    changed = result.rowcount > 0
+    delta = 1 if liked else -1
+    if changed and settings.LIKE_DURABILITY == "immediate":
+        await db.execute(_ADD_LIKES, {"post_id": post_id, "delta": delta})
+    await db.commit()
+    if changed:
+        LIKED_POSTS.invalidate(user_id)
+        if settings.LIKE_DURABILITY == "buffered":
+            LIKES.add(post_id, delta)
+    return changed
+
+
+async def discard_user_likes(db: AsyncSession, user_id: int) -> None:
+    """Delete the likes a user gave and those on their posts.
+
+    The likes they gave are taken off the counts of the posts they liked.
+    Runs in the caller's transaction.
+    """
+    given = select(models.PostLike.post_id).where(models.PostLike.user_id == user_id)
+    await db.execute(
+        update(_posts)
+        .where(_posts.c.id.in_(given))
+        .values(likes=_posts.c.likes - 1, updated_at=_posts.c.updated_at),
+    )
+    own_posts = select(models.Post.id).where(models.Post.user_id == user_id)
+    await db.execute(
+        delete(models.PostLike).where(
+            or_(
+                models.PostLike.user_id == user_id,
+                models.PostLike.post_id.in_(own_posts),
+            ),
+        ),
+    )
+
+
+async def discard_post_likes(db: AsyncSession, post_id: int) -> None:
+    await db.execute(delete(models.PostLike).where(models.PostLike.post_id == post_id))
@@ -1,4 +1,6 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from pathlib import Path
 from typing import Annotated
 
 from fastapi import Depends, FastAPI, HTTPException, Request, status
@@ -7,31 +9,85 @@ from fastapi.exception_handlers import (
     request_validation_exception_handler,
 )
 from fastapi.exceptions import RequestValidationError
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from sqlalchemy import func, select
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 import models
+from auth import shutdown_hash_executor
 from config import settings
-from database import engine, get_db
+from database import AsyncSessionLocal, engine, get_db
+from image_utils import shutdown_image_executor
+from likes import LIKES
+from middleware import DynamicGZipMiddleware, MaxBodySizeMiddleware
+from page_cache import cached_page
+from pagination import (
+    FEED_ORDER,
+    encode_cursor,
+    load_post_fields,
+    split_user_feed,
+    user_feed_query,
+)
 from routers import posts, users
+from search import MEMORY_SEARCH
+from static_files import CachedStaticFiles, fingerprinted_url_for
+from trending import TRENDING
 
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
+    tasks = [
+        asyncio.create_task(LIKES.run(settings.LIKE_FLUSH_INTERVAL_SECONDS)),
+        asyncio.create_task(TRENDING.run(settings.TRENDING_REFRESH_SECONDS)),
+    ]
+    snapshot = Path(settings.SEARCH_SNAPSHOT_PATH)
+    if settings.SEARCH_BACKEND == "memory":
+        # Start from the last snapshot when there is one and only index the
+        # posts changed since
+        MEMORY_SEARCH.load_snapshot(snapshot)
+        async with AsyncSessionLocal() as db:
+            await MEMORY_SEARCH.sync(db)
+        tasks.append(asyncio.create_task(MEMORY_SEARCH.run(settings.SEARCH_SYNC_SECONDS)))
     yield
     # Shutdown
+    for task in reversed(tasks):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    if settings.SEARCH_BACKEND == "memory":
+        MEMORY_SEARCH.save_snapshot(snapshot)
+    shutdown_hash_executor()
+    shutdown_image_executor()
     await engine.dispose()
 
 app = FastAPI(lifespan=lifespan)
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
-app.mount("/media", StaticFiles(directory="media"), name="media")
+app.add_middleware(
+    DynamicGZipMiddleware,
+    minimum_size=settings.GZIP_MINIMUM_SIZE,
+    exclude_prefixes=("/static/", "/media/"),
+)
+
+app.add_middleware(
+    MaxBodySizeMiddleware,
+    # Leave room for the multipart boundaries and part headers
+    max_body_size=settings.MAX_UPLOAD_SIZE_BYTES + 64 * 1024,
+    path_pattern=r"/api/users/\d+/picture",
+    detail=f"File too large. Maximum size is {settings.MAX_UPLOAD_SIZE_BYTES // (1024 * 1024)}MB",
+)
+
+static_files = CachedStaticFiles(directory="static", fingerprint=True, precompress=True)
+app.mount("/static", static_files, name="static")
+# Uploaded media is content-addressed, so any URL under it is immutable
+app.mount("/media", CachedStaticFiles(directory="media", immutable=True), name="media")
 
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["url_for"] = fingerprinted_url_for(static_files)
+
+# Post lists show a preview; the full content is only read on the post page
+LISTING_FIELDS = ("id", "title", "excerpt", "date_posted", "author")
 
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(posts.router, prefix="/api/posts", tags=["posts"])
@@ -39,19 +95,18 @@ app.include_router(posts.router, prefix="/api/posts", tags=["posts"])
 
 @app.get("/", include_in_schema=False, name="home")
 @app.get("/posts", include_in_schema=False, name="posts")
+@cached_page("home")
 async def home(request: Request, db: Annotated[AsyncSession, Depends(get_db)]):
-    count_result = await db.execute(select(func.count()).select_from(models.Post))
-    total = count_result.scalar() or 0
-
     result = await db.execute(
         select(models.Post)
-        .options(selectinload(models.Post.author))
-        .order_by(models.Post.date_posted.desc())
-        .limit(settings.POSTS_PER_PAGE),
+        .options(load_post_fields(LISTING_FIELDS), selectinload(models.Post.author))
+        .order_by(*FEED_ORDER)
+        .limit(settings.POSTS_PER_PAGE + 1),
     )
     posts = result.scalars().all()
 
-    has_more = len(posts) < total
+    has_more = len(posts) > settings.POSTS_PER_PAGE
+    posts = posts[: settings.POSTS_PER_PAGE]
 
     return templates.TemplateResponse(
         request,
@@ -61,11 +116,13 @@ async def home(request: Request, db: Annotated[AsyncSession, Depends(get_db)]):
             "title": "Home",
             "limit": settings.POSTS_PER_PAGE,
             "has_more": has_more,
+            "next_cursor": encode_cursor(posts[-1]) if has_more else None,
         },
     )
 
 
 @app.get("/posts/{post_id}", include_in_schema=False)
+@cached_page("post_page")
 async def post_page(
     request: Request,
     post_id: int,
@@ -88,36 +145,25 @@ async def post_page(
 
 
 @app.get("/users/{user_id}/posts", include_in_schema=False, name="user_posts")
+@cached_page("user_posts")
 async def user_posts_page(
     request: Request,
     user_id: int,
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
-    result = await db.execute(select(models.User).where(models.User.id == user_id))
-    user = result.scalars().first()
+    result = await db.execute(
+        user_feed_query(user_id, settings.POSTS_PER_PAGE + 1)
+        .options(load_post_fields(LISTING_FIELDS)),
+    )
+    user, posts = split_user_feed(result.all())
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found",
         )
 
-    count_result = await db.execute(
-        select(func.count())
-        .select_from(models.Post)
-        .where(models.Post.user_id == user_id),
-    )
-    total = count_result.scalar() or 0
-
-    result = await db.execute(
-        select(models.Post)
-        .options(selectinload(models.Post.author))
-        .where(models.Post.user_id == user_id)
-        .order_by(models.Post.date_posted.desc())
-        .limit(settings.POSTS_PER_PAGE),
-    )
-    posts = result.scalars().all()
-
-    has_more = len(posts) < total
+    has_more = len(posts) > settings.POSTS_PER_PAGE
+    posts = posts[: settings.POSTS_PER_PAGE]
 
     return templates.TemplateResponse(
         request,
@@ -128,6 +174,7 @@ async def user_posts_page(
             "title": f"{user.username}'s Posts",
             "limit": settings.POSTS_PER_PAGE,
             "has_more": has_more,
+            "next_cursor": encode_cursor(posts[-1]) if has_more else None,
         },
     )
 
@@ -0,0 +1,87 @@
+import re
+
+from fastapi import HTTPException, status
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class MaxBodySizeMiddleware:
+    """Reject request bodies over `max_body_size` on matching paths.
+
+    A declared Content-Length over the limit is refused before any of the
+    body is read. Otherwise the body is counted as it streams in and the
+    request is aborted as soon as the limit is passed, so an oversized
+    upload is never buffered in full.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_body_size: int,
+        path_pattern: str,
+        detail: str = "Request body too large",
+    ) -> None:
+        self.app = app
+        self.max_body_size = max_body_size
+        self.path_re = re.compile(path_pattern)
+        self.detail = detail
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.path_re.fullmatch(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length")
+        if (
+            content_length is not None
+            and content_length.isdigit()
+            and int(content_length) > self.max_body_size
+        ):
+            response = JSONResponse(
+                {"detail": self.detail},
+                status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+                        detail=self.detail,
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+class DynamicGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that skips paths under `exclude_prefixes`.
+
+    Static mounts serve their own precompressed files, and images gain
+    nothing from gzip, so only dynamic HTML and JSON is compressed here.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        compresslevel: int = 9,
+        exclude_prefixes: tuple[str, ...] = (),
+    ) -> None:
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.exclude_prefixes = exclude_prefixes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"].startswith(self.exclude_prefixes):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
@@ -2,10 +2,27 @@ from __future__ import annotations
 
 from datetime import UTC, datetime
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import JSON, DateTime, ForeignKey, Index, Integer, String, Text, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database import Base
+from image_names import variant_filename
+
+POST_EXCERPT_LENGTH = 200
+
+
+def make_excerpt(content: str) -> str:
+    """Shorten post content to a preview of at most POST_EXCERPT_LENGTH chars.
+
+    Whitespace is collapsed and long content is cut at a word boundary.
+    """
+    text = " ".join(content.split())
+    if len(text) <= POST_EXCERPT_LENGTH:
+        return text
+    cut = text[: POST_EXCERPT_LENGTH - 1]
+    if " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut.rstrip() + "…"
 
 
 class User(Base):
@@ -19,6 +36,17 @@ class User(Base):
         String(200),
         nullable=True,
         default=None,
+        index=True,
+    )
+    image_variants: Mapped[list[int] | None] = mapped_column(
+        JSON,
+        nullable=True,
+        default=None,
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(UTC),
+        onupdate=lambda: datetime.now(UTC),
     )
     posts: Mapped[list[Post]] = relationship(
         back_populates="author",
@@ -35,13 +63,30 @@ class User(Base):
             return f"/media/profile_pics/{self.image_file}"
         return "/static/profile_pics/default.jpg"
 
+    @property
+    def image_srcset(self) -> str:
+        if self.image_file and self.image_variants:
+            return ", ".join(
+                f"/media/profile_pics/{variant_filename(self.image_file, width)} {width}w"
+                for width in self.image_variants
+            )
+        return f"{self.image_path} 300w"
+
+
+Index("ix_users_username_lower", func.lower(User.username))
+Index("ix_users_email_lower", func.lower(User.email))
+
 
 class Post(Base):
     __tablename__ = "posts"
+    __table_args__ = (
+        Index("ix_posts_user_id_date_posted_id", "user_id", "date_posted", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     title: Mapped[str] = mapped_column(String(100), nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
+    excerpt: Mapped[str] = mapped_column(String(POST_EXCERPT_LENGTH), nullable=False)
     user_id: Mapped[int] = mapped_column(
         ForeignKey("users.id"),
         nullable=False,
@@ -52,18 +97,55 @@ class Post(Base):
         default=lambda: datetime.now(UTC),
     )
     likes: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(UTC),
+        onupdate=lambda: datetime.now(UTC),
+    )
     author: Mapped[User] = relationship(back_populates="posts")
 
 
+Index("ix_posts_date_posted_id", Post.date_posted.desc(), Post.id.desc())
+
+
 class PasswordResetToken(Base):
     __tablename__ = "password_reset_tokens"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id"),
+        nullable=False,
+        index=True,
+    )
     token_hash: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
     expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), 
         default=lambda: datetime.now(UTC),
     )
-    user: Mapped[User] = relationship(back_populates="reset_tokens")
\ No newline at end of file
+    user: Mapped[User] = relationship(back_populates="reset_tokens")
+
+
+class PostLike(Base):
+    __tablename__ = "post_likes"
+
+    # (user_id, post_id) keeps each user's likes together in the primary key
+    # index, which is all that loading a user's liked posts needs
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    post_id: Mapped[int] = mapped_column(
+        ForeignKey("posts.id"),
+        primary_key=True,
+        index=True,
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(UTC),
+        index=True,
+    )
+
+
+class PostCount(Base):
+    __tablename__ = "post_counts"
+
+    key: Mapped[str] = mapped_column(String(32), primary_key=True)
+    value: Mapped[int] = mapped_column(Integer, nullable=False)
\ No newline at end of file
@@ -0,0 +1,154 @@
+import asyncio
+import functools
+import time
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+from typing import Any
+
+from fastapi import Request
+from starlette.responses import Response
+
+from cache import TTLCache
+from config import settings
+from database import AsyncSessionLocal
+
+
+@dataclass
+class CachedPage:
+    body: bytes
+    status_code: int
+    media_type: str | None
+    headers: dict[str, str]
+    stored_at: float
+
+    def to_response(self) -> Response:
+        return Response(
+            content=self.body,
+            status_code=self.status_code,
+            media_type=self.media_type,
+            headers=self.headers,
+        )
+
+
+class PageCache:
+    """In-process cache of rendered HTML pages.
+
+    Entries are fresh for the route's `PAGE_CACHE_TTL_SECONDS` and may then
+    be served stale for another `PAGE_CACHE_STALE_SECONDS` while a single
+    background task re-renders them. At most `PAGE_CACHE_SIZE` pages are
+    kept, least recently served first out. Any write to posts or users
+    clears the whole cache; other worker processes catch up within the TTL.
+    """
+
+    def __init__(self) -> None:
+        self._pages: TTLCache[Hashable, CachedPage] = TTLCache(
+            settings.PAGE_CACHE_SIZE,
+            max(settings.PAGE_CACHE_TTL_SECONDS.values(), default=0)
+            + settings.PAGE_CACHE_STALE_SECONDS,
+        )
+        self._refreshing: set[Hashable] = set()
+        self._tasks: set[asyncio.Task[None]] = set()
+        # Bumped on every invalidation, so renders that started before a
+        # write never store their now-outdated output.
+        self._generation = 0
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._pages.clear()
+
+    async def _render(
+        self,
+        key: Hashable,
+        ttl: float,
+        render: Callable[[], Awaitable[Response]],
+    ) -> Response:
+        generation = self._generation
+        response = await render()
+        if response.status_code == 200 and generation == self._generation:
+            page = CachedPage(
+                body=bytes(response.body),
+                status_code=response.status_code,
+                media_type=response.media_type,
+                headers={
+                    name: value
+                    for name, value in response.headers.items()
+                    if name != "content-length"
+                },
+                stored_at=time.monotonic(),
+            )
+            self._pages.set(key, page, ttl=ttl + settings.PAGE_CACHE_STALE_SECONDS)
+        return response
+
+    async def _refresh(
+        self,
+        key: Hashable,
+        ttl: float,
+        render: Callable[[], Awaitable[Response]],
+    ) -> None:
+        try:
+            await self._render(key, ttl, render)
+        finally:
+            self._refreshing.discard(key)
+
+    async def get_or_render(
+        self,
+        key: Hashable,
+        ttl: float,
+        render: Callable[[], Awaitable[Response]],
+        refresh: Callable[[], Awaitable[Response]],
+    ) -> Response:
+        page = self._pages.get(key)
+        if page is not None:
+            age = time.monotonic() - page.stored_at
+            if age < ttl:
+                return page.to_response()
+            if age < ttl + settings.PAGE_CACHE_STALE_SECONDS:
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    task = asyncio.create_task(self._refresh(key, ttl, refresh))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                return page.to_response()
+        return await self._render(key, ttl, render)
+
+
+PAGE_CACHE = PageCache()
+
+
+def cached_page(route: str):
+    """Serve a page handler's output from `PAGE_CACHE`.
+
+    The handler must take `request` and `db` keyword arguments; background
+    refreshes call it again with a session of their own. Pages are cached
+    by route and path parameters, so the handler must not read the query
+    string.
+    """
+
+    def decorator(
+        handler: Callable[..., Awaitable[Response]],
+    ) -> Callable[..., Awaitable[Response]]:
+        @functools.wraps(handler)
+        async def wrapper(request: Request, **kwargs: Any) -> Response:
+            ttl = settings.PAGE_CACHE_TTL_SECONDS.get(route, 0)
+            if ttl <= 0:
+                return await handler(request=request, **kwargs)
+
+            async def refresh() -> Response:
+                async with AsyncSessionLocal() as db:
+                    return await handler(request=request, **{**kwargs, "db": db})
+
+            # Only what the handler reads: the query string is ignored, so
+            # arbitrary parameters cannot multiply the entries of a page
+            key = (route, *sorted(
+                (name, value) for name, value in kwargs.items() if name != "db"
+            ))
+            return await PAGE_CACHE.get_or_render(
+                key,
+                ttl,
+                lambda: handler(request=request, **kwargs),
+                refresh,
+            )
+
+        return wrapper
+
+    return decorator
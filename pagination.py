@@ -0,0 +1,263 @@
+import base64
+import binascii
+from collections.abc import Container, Mapping, Sequence
+from datetime import datetime
+from typing import Any
+
+from fastapi import HTTPException, status
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+from sqlalchemy import ColumnElement, Row, Select, and_, or_, select
+from sqlalchemy.orm import load_only
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.interfaces import LoaderOption
+
+import models
+from schemas import (
+    PaginatedPostsResponse,
+    PostResponse,
+    PostSummary,
+    SideloadedPostsResponse,
+    UserPublic,
+)
+
+FEED_ORDER = (models.Post.date_posted.desc(), models.Post.id.desc())
+
+POST_LIST_ADAPTER = TypeAdapter(list[PostResponse])
+PAGE_ADAPTER = TypeAdapter(PaginatedPostsResponse)
+POST_SUMMARY_LIST_ADAPTER = TypeAdapter(list[PostSummary])
+SIDELOADED_PAGE_ADAPTER = TypeAdapter(SideloadedPostsResponse)
+
+POST_FIELDS = ("id", "title", "content", "excerpt", "user_id", "date_posted", "author")
+DEFAULT_POST_FIELDS = ("id", "title", "content", "user_id", "date_posted", "author")
+# Always read: the cursor is built from date_posted and id, and user_id
+# links a post to its author
+_KEY_POST_COLUMNS = ("id", "date_posted", "user_id")
+
+
+def encode_cursor(post: models.Post) -> str:
+    """Encode the sort key of the last post of a page as an opaque cursor."""
+    raw = f"{post.date_posted.isoformat()}|{post.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decode a cursor produced by `encode_cursor` into (date_posted, id)."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        date_part, id_part = raw.rsplit("|", 1)
+        return datetime.fromisoformat(date_part), int(id_part)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as err:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        ) from err
+
+
+def posts_after(cursor: str) -> ColumnElement[bool]:
+    """Seek condition for the posts that follow `cursor` in `FEED_ORDER`."""
+    date_posted, post_id = decode_cursor(cursor)
+    return or_(
+        models.Post.date_posted < date_posted,
+        and_(models.Post.date_posted == date_posted, models.Post.id < post_id),
+    )
+
+
+def parse_post_fields(fields: str | None, *, excerpt: bool = False) -> tuple[str, ...] | None:
+    """Resolve the `fields` and `excerpt` query parameters of a feed.
+
+    `fields` is a comma-separated subset of `POST_FIELDS`; `excerpt` swaps
+    `content` for the stored `excerpt`. Returns None for the default full
+    shape, which keeps to the faster `paginated_posts_json` path.
+    """
+    if fields is None:
+        if not excerpt:
+            return None
+        selected = list(DEFAULT_POST_FIELDS)
+    else:
+        selected = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = sorted(set(selected) - set(POST_FIELDS))
+        if unknown or not selected:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid fields, choose from: {', '.join(POST_FIELDS)}",
+            )
+    if excerpt:
+        selected = ["excerpt" if name == "content" else name for name in selected]
+    return tuple(dict.fromkeys(selected))
+
+
+def load_post_fields(fields: Sequence[str]) -> LoaderOption:
+    """Loader option that reads only the post columns behind `fields`.
+
+    Everything else, notably the `content` Text column, stays deferred and
+    raises if touched, rather than costing a query per row.
+    """
+    names = dict.fromkeys((*_KEY_POST_COLUMNS, *fields))
+    names.pop("author", None)
+    return load_only(*(getattr(models.Post, name) for name in names), raiseload=True)
+
+
+def user_feed_query(
+    user_id: int,
+    limit: int,
+    *,
+    skip: int = 0,
+    cursor: str | None = None,
+    columns: Sequence[Any] = (models.User, models.Post),
+) -> Select[Any]:
+    """Select a user together with one page of their posts.
+
+    The posts are outer-joined onto the user row, so one round trip both
+    checks that the user exists and reads the page as a range of
+    `ix_posts_user_id_date_posted_id`. A user without posts yields a single
+    row whose post is None. `columns` narrows what is read, e.g. to just
+    the version columns.
+    """
+    join_on = models.Post.user_id == models.User.id
+    if cursor is not None:
+        join_on = and_(join_on, posts_after(cursor))
+    return (
+        select(*columns)
+        .select_from(models.User)
+        .outerjoin(models.Post, join_on)
+        .where(models.User.id == user_id)
+        .order_by(*FEED_ORDER)
+        .offset(skip)
+        .limit(limit)
+    )
+
+
+def split_user_feed(
+    rows: Sequence[Row[tuple[models.User, models.Post | None]]],
+) -> tuple[models.User | None, list[models.Post]]:
+    """Unpack the rows of `user_feed_query` into the user and their posts."""
+    if not rows:
+        return None, []
+    user = rows[0][0]
+    posts = [post for _, post in rows if post is not None]
+    for post in posts:
+        set_committed_value(post, "author", user)
+    return user, posts
+
+
+def _mark_liked[T: PostSummary](items: list[T], liked: Container[int] | None) -> list[T]:
+    if liked is not None:
+        for item in items:
+            item.liked_by_me = item.id in liked
+    return items
+
+
+def paginated_posts_json(
+    posts: Sequence[models.Post],
+    *,
+    limit: int,
+    skip: int,
+    total: int | None,
+    liked: Container[int] | None = None,
+) -> bytes:
+    """Serialize a page read with `limit + 1` rows straight to JSON bytes.
+
+    The ORM rows are validated once, in a single call, and the envelope is
+    built without validation, so callers can return the bytes in a plain
+    Response and skip FastAPI's response_model pass. With `liked`, the ids
+    of the posts the reader likes, each post is flagged `liked_by_me`.
+    """
+    has_more = len(posts) > limit
+    posts = posts[:limit]
+    page = PaginatedPostsResponse.model_construct(
+        posts=_mark_liked(POST_LIST_ADAPTER.validate_python(posts, from_attributes=True), liked),
+        total=total,
+        skip=skip,
+        limit=limit,
+        has_more=has_more,
+        next_cursor=encode_cursor(posts[-1]) if has_more else None,
+    )
+    return PAGE_ADAPTER.dump_json(page)
+
+
+def sideloaded_posts_json(
+    posts: Sequence[models.Post],
+    authors: Mapping[int, models.User],
+    *,
+    limit: int,
+    skip: int,
+    total: int | None,
+    liked: Container[int] | None = None,
+) -> bytes:
+    """Like `paginated_posts_json`, but each author is serialized only once.
+
+    Posts carry just their `user_id`; `authors` maps those ids to users.
+    """
+    has_more = len(posts) > limit
+    posts = posts[:limit]
+    page = SideloadedPostsResponse.model_construct(
+        posts=_mark_liked(
+            POST_SUMMARY_LIST_ADAPTER.validate_python(posts, from_attributes=True),
+            liked,
+        ),
+        authors={
+            user_id: UserPublic.model_validate(authors[user_id])
+            for user_id in {post.user_id for post in posts}
+        },
+        total=total,
+        skip=skip,
+        limit=limit,
+        has_more=has_more,
+        next_cursor=encode_cursor(posts[-1]) if has_more else None,
+    )
+    return SIDELOADED_PAGE_ADAPTER.dump_json(page)
+
+
+def sparse_posts_json(
+    posts: Sequence[models.Post],
+    fields: Sequence[str],
+    *,
+    authors: Mapping[int, models.User] | None = None,
+    limit: int,
+    skip: int,
+    total: int | None,
+    liked: Container[int] | None = None,
+) -> bytes:
+    """Serialize a page holding only the selected `fields` of each post.
+
+    With `authors`, authors are sideloaded as in `sideloaded_posts_json`
+    and each post keeps its `user_id` in place of an embedded author.
+    """
+    has_more = len(posts) > limit
+    posts = posts[:limit]
+    if authors is not None:
+        fields = [name for name in fields if name != "author"]
+        if "user_id" not in fields:
+            fields.append("user_id")
+
+    public: dict[int, UserPublic] = {}
+
+    def author_of(post: models.Post) -> UserPublic:
+        if post.user_id not in public:
+            user = post.author if authors is None else authors[post.user_id]
+            public[post.user_id] = UserPublic.model_validate(user)
+        return public[post.user_id]
+
+    items = [
+        {
+            name: author_of(post) if name == "author" else getattr(post, name)
+            for name in fields
+        }
+        for post in posts
+    ]
+    if liked is not None:
+        for item, post in zip(items, posts):
+            item["liked_by_me"] = post.id in liked
+    page: dict[str, Any] = {"posts": items}
+    if authors is not None:
+        page["authors"] = {post.user_id: author_of(post) for post in posts}
+    page.update(
+        total=total,
+        skip=skip,
+        limit=limit,
+        has_more=has_more,
+        next_cursor=encode_cursor(posts[-1]) if has_more else None,
+    )
+    return to_json(page)
@@ -9,6 +9,7 @@ import models
 from database import AsyncSessionLocal, engine
 from image_utils import PROFILE_PICS_DIR
 from main import app
+from search import search_backend
 
 
 POPULATE_IMAGES_DIR = Path("populate_images")
@@ -249,8 +250,11 @@ async def clear_existing_data() -> None:
     # Clear database tables (order respects foreign keys)
     async with AsyncSessionLocal() as db:
         await db.execute(delete(models.PasswordResetToken))
+        await db.execute(delete(models.PostLike))
+        await search_backend(db).clear(db)
         await db.execute(delete(models.Post))
         await db.execute(delete(models.User))
+        await db.execute(delete(models.PostCount))
         await db.commit()
     print("Cleared existing data")
 
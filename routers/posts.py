@@ -1,46 +1,146 @@
+from datetime import datetime
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import func, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import Select, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 import models
-from auth import CurrentUser
+from auth import CurrentUser, ViewerId
+from conditional import latest, make_etag, not_modified, validator_headers
 from config import settings
+from counts import adjust_post_count, count_posts
 from database import get_db
-from schemas import PaginatedPostsResponse, PostCreate, PostResponse, PostUpdate
+from likes import LIKES, PostIdSet, discard_post_likes, liked_post_ids, set_liked
+from page_cache import PAGE_CACHE
+from pagination import (
+    FEED_ORDER,
+    load_post_fields,
+    paginated_posts_json,
+    parse_post_fields,
+    posts_after,
+    sideloaded_posts_json,
+    sparse_posts_json,
+)
+from schemas import (
+    PaginatedPostsResponse,
+    PostCreate,
+    PostLikes,
+    PostResponse,
+    PostSearchResponse,
+    PostUpdate,
+    SideloadedPostsResponse,
+)
+from search import encode_search_cursor, search_backend, search_posts
+from singleflight import READ_FLIGHTS, VERSION_FLIGHTS
+from trending import TRENDING
 
 router = APIRouter()
 
 
-@router.get("", response_model=PaginatedPostsResponse)
+@router.get("", response_model=PaginatedPostsResponse | SideloadedPostsResponse)
 async def get_posts(
+    request: Request,
     db: Annotated[AsyncSession, Depends(get_db)],
+    viewer_id: ViewerId,
     skip: Annotated[int, Query(ge=0)] = 0,
     limit: Annotated[int, Query(ge=1, le=100)] = settings.POSTS_PER_PAGE,
+    cursor: Annotated[str | None, Query()] = None,
+    include_total: bool = True,
+    sideload_authors: bool = False,
+    fields: Annotated[str | None, Query()] = None,
+    excerpt: bool = False,
 ):
+    selected = parse_post_fields(fields, excerpt=excerpt)
+    if cursor is not None:
+        skip = 0
 
-    count_result = await db.execute(select(func.count()).select_from(models.Post))
-    total = count_result.scalar() or 0
+    def page(query: Select) -> Select:
+        query = query.order_by(*FEED_ORDER).offset(skip)
+        if cursor is not None:
+            # Seek past the last post of the previous page instead of skipping rows
+            query = query.where(posts_after(cursor))
+        # Read one extra row so has_more does not depend on the total
+        return query.limit(limit + 1)
 
-    result = await db.execute(
-        select(models.Post)
-        .options(selectinload(models.Post.author))
-        .order_by(models.Post.date_posted.desc())
-        .offset(skip)
-        .limit(limit),
+    async def validate() -> tuple[str, int | None, PostIdSet | None]:
+        total = await count_posts(db) if include_total else None
+        result = await db.execute(
+            page(
+                select(models.Post.id, models.Post.updated_at, models.User.updated_at)
+                .join(models.Post.author),
+            ),
+        )
+        versions = [tuple(row) for row in result]
+        # Personalized pages validate against the reader's flags for these posts
+        liked = await liked_post_ids(db, viewer_id) if viewer_id is not None else None
+        liked_flags = None if liked is None else [post_id in liked for post_id, *_ in versions]
+        etag = make_etag("posts", skip, limit, cursor, total, versions, liked_flags)
+        return etag, total, liked
+
+    # Compare the client's validators against the page's version columns
+    # before loading and serializing full rows; identical concurrent reads
+    # share one round of version queries
+    etag, total, liked = await VERSION_FLIGHTS.do(
+        ("posts", skip, limit, cursor, include_total, viewer_id),
+        validate,
     )
-    posts = result.scalars().all()
+    if (response := not_modified(request, etag)) is not None:
+        return response
 
-    has_more = skip + len(posts) < total
+    async def load() -> bytes:
+        query = select(models.Post)
+        if selected is not None:
+            query = query.options(load_post_fields(selected))
+        if not sideload_authors and (selected is None or "author" in selected):
+            query = query.options(selectinload(models.Post.author))
+        result = await db.execute(page(query))
+        posts = result.scalars().all()
+        authors = None
+        if sideload_authors:
+            # Each author once, in a map keyed by user_id, read with a single
+            # IN query in this transaction so it matches the ETag's versions
+            result = await db.execute(
+                select(models.User).where(
+                    models.User.id.in_({post.user_id for post in posts[:limit]}),
+                ),
+            )
+            authors = {user.id: user for user in result.scalars()}
+        if selected is not None:
+            return sparse_posts_json(
+                posts,
+                selected,
+                authors=authors,
+                limit=limit,
+                skip=skip,
+                total=total,
+                liked=liked,
+            )
+        if authors is not None:
+            return sideloaded_posts_json(
+                posts,
+                authors,
+                limit=limit,
+                skip=skip,
+                total=total,
+                liked=liked,
+            )
+        return paginated_posts_json(
+            posts,
+            limit=limit,
+            skip=skip,
+            total=total,
+            liked=liked,
+        )
 
-    return PaginatedPostsResponse(
-        posts=[PostResponse.model_validate(post) for post in posts],
-        total=total,
-        skip=skip,
-        limit=limit,
-        has_more=has_more,
+    # Identical concurrent feed reads share a single query and its JSON; the
+    # ETag is part of the key so a body is never older than its validator
+    key = ("posts", skip, limit, cursor, include_total, sideload_authors, selected, etag)
+    return Response(
+        await READ_FLIGHTS.do(key, load),
+        media_type="application/json",
+        headers=validator_headers(etag),
     )
 
 
@@ -57,25 +157,111 @@ async def create_post(
     new_post = models.Post(
         title=post.title,
         content=post.content,
+        excerpt=models.make_excerpt(post.content),
         user_id=current_user.id,
     )
     db.add(new_post)
+    await adjust_post_count(db, current_user.id, 1)
+    await db.flush()
+    await search_backend(db).index_post(db, new_post)
     await db.commit()
+    PAGE_CACHE.invalidate()
     await db.refresh(new_post, attribute_names=["author"])
     return new_post
 
 
-@router.get("/{post_id}", response_model=PostResponse)
-async def get_post(post_id: int, db: Annotated[AsyncSession, Depends(get_db)]):
+@router.get("/trending", response_model=PaginatedPostsResponse)
+async def get_trending_posts(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    skip: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=100)] = settings.POSTS_PER_PAGE,
+):
+    # The ranking is precomputed by the TRENDING background task; a read
+    # only looks up the posts of one slice of it by primary key
+    ranked = TRENDING.top
+    post_ids = ranked[skip : skip + limit]
     result = await db.execute(
         select(models.Post)
         .options(selectinload(models.Post.author))
-        .where(models.Post.id == post_id),
+        .where(models.Post.id.in_(post_ids)),
+    )
+    posts = {post.id: post for post in result.scalars()}
+    return PaginatedPostsResponse(
+        # Posts deleted since the last refresh are skipped
+        posts=[posts[post_id] for post_id in post_ids if post_id in posts],
+        total=len(ranked),
+        skip=skip,
+        limit=limit,
+        has_more=skip + limit < len(ranked),
+    )
+
+
+@router.get("/search", response_model=PostSearchResponse)
+async def search(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    limit: Annotated[int, Query(ge=1, le=100)] = settings.POSTS_PER_PAGE,
+    cursor: Annotated[str | None, Query()] = None,
+):
+    matches = await search_posts(db, q, limit + 1, cursor)
+    has_more = len(matches) > limit
+    matches = matches[:limit]
+    result = await db.execute(
+        select(models.Post)
+        .options(selectinload(models.Post.author))
+        .where(models.Post.id.in_([post_id for post_id, _ in matches])),
+    )
+    posts = {post.id: post for post in result.scalars()}
+    next_cursor = None
+    if has_more:
+        # Rows are (id, score); cursors hold (score, id)
+        last_id, last_score = matches[-1]
+        next_cursor = encode_search_cursor(last_score, last_id)
+    return PostSearchResponse(
+        posts=[posts[post_id] for post_id, _ in matches if post_id in posts],
+        limit=limit,
+        has_more=has_more,
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/{post_id}", response_model=PostResponse)
+async def get_post(
+    request: Request,
+    post_id: int,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    async def validate() -> tuple[str, datetime | None]:
+        result = await db.execute(
+            select(models.Post.updated_at, models.User.updated_at)
+            .join(models.Post.author)
+            .where(models.Post.id == post_id),
+        )
+        versions = result.first()
+        if versions is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
+        return make_etag("post", post_id, tuple(versions)), latest(versions)
+
+    etag, last_modified = await VERSION_FLIGHTS.do(("post", post_id), validate)
+    if (response := not_modified(request, etag, last_modified)) is not None:
+        return response
+
+    async def load() -> bytes:
+        result = await db.execute(
+            select(models.Post)
+            .options(selectinload(models.Post.author))
+            .where(models.Post.id == post_id),
+        )
+        post = result.scalars().first()
+        if post:
+            return PostResponse.model_validate(post).model_dump_json().encode()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
+
+    return Response(
+        await READ_FLIGHTS.do(("post", post_id, etag), load),
+        media_type="application/json",
+        headers=validator_headers(etag, last_modified),
     )
-    post = result.scalars().first()
-    if post:
-        return post
-    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
 
 
 @router.put("/{post_id}", response_model=PostResponse)
@@ -101,8 +287,11 @@ async def update_post_full(
 
     post.title = post_data.title
     post.content = post_data.content
+    post.excerpt = models.make_excerpt(post_data.content)
+    await search_backend(db).index_post(db, post)
 
     await db.commit()
+    PAGE_CACHE.invalidate()
     await db.refresh(post, attribute_names=["author"])
     return post
 
@@ -131,8 +320,13 @@ async def update_post_partial(
     update_data = post_data.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(post, field, value)
+    if "content" in update_data:
+        post.excerpt = models.make_excerpt(post.content)
+    if update_data:
+        await search_backend(db).index_post(db, post)
 
     await db.commit()
+    PAGE_CACHE.invalidate()
     await db.refresh(post, attribute_names=["author"])
     return post
 
@@ -157,5 +351,50 @@ async def delete_post(
             detail="Not authorized to delete this post",
         )
 
+    await discard_post_likes(db, post.id)
+    await search_backend(db).remove_post(db, post.id)
     await db.delete(post)
-    await db.commit()
\ No newline at end of file
+    await adjust_post_count(db, post.user_id, -1)
+    await db.commit()
+    PAGE_CACHE.invalidate()
+
+
+async def _set_liked(
+    post_id: int,
+    liked: bool,
+    current_user: models.User,
+    db: AsyncSession,
+) -> PostLikes:
+    result = await db.execute(select(models.Post.likes).where(models.Post.id == post_id))
+    likes = result.scalar_one_or_none()
+    if likes is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Post not found",
+        )
+    changed = await set_liked(db, current_user.id, post_id, liked)
+    if changed and settings.LIKE_DURABILITY == "immediate":
+        likes += 1 if liked else -1
+    return PostLikes(
+        post_id=post_id,
+        likes=likes + LIKES.pending(post_id),
+        liked_by_me=liked,
+    )
+
+
+@router.post("/{post_id}/like", response_model=PostLikes)
+async def like_post(
+    post_id: int,
+    current_user: CurrentUser,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    return await _set_liked(post_id, True, current_user, db)
+
+
+@router.delete("/{post_id}/like", response_model=PostLikes)
+async def unlike_post(
+    post_id: int,
+    current_user: CurrentUser,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    return await _set_liked(post_id, False, current_user, db)
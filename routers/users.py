@@ -1,3 +1,4 @@
+from concurrent.futures.process import BrokenProcessPool
 from datetime import UTC, datetime, timedelta
 from typing import Annotated
 
@@ -7,6 +8,8 @@ from fastapi import (
     Depends,
     HTTPException,
     Query,
+    Request,
+    Response,
     UploadFile,
     status,
 )
@@ -15,38 +18,76 @@ from PIL import UnidentifiedImageError
 from sqlalchemy import delete as sql_delete
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from starlette.concurrency import run_in_threadpool
 
 import models
 from auth import (
     CurrentUser,
+    ViewerId,
     create_access_token,
     generate_reset_token,
     hash_password,
     hash_reset_token,
+    invalidate_cached_user,
     verify_password,
 )
+from conditional import latest, make_etag, not_modified, validator_headers
 from config import settings
+from counts import count_posts, discard_user_count
 from database import get_db
 from email_utils import send_password_reset_email
-from image_utils import delete_profile_image, process_profile_image
+from image_names import profile_image_filename
+from image_utils import (
+    delete_profile_image,
+    profile_image_lock,
+    render_profile_image_in_pool,
+    store_profile_image,
+)
+from likes import LIKED_POSTS, PostIdSet, discard_user_likes, liked_post_ids
+from page_cache import PAGE_CACHE
+from pagination import (
+    load_post_fields,
+    paginated_posts_json,
+    parse_post_fields,
+    sideloaded_posts_json,
+    sparse_posts_json,
+    split_user_feed,
+    user_feed_query,
+)
 from schemas import (
     ChangePasswordRequest,
     ForgotPasswordRequest,
     PaginatedPostsResponse,
-    PostResponse,
     ResetPasswordRequest,
+    SideloadedPostsResponse,
     Token,
     UserCreate,
     UserPrivate,
     UserPublic,
     UserUpdate,
 )
+from search import search_backend
+from singleflight import READ_FLIGHTS, VERSION_FLIGHTS
 
 router = APIRouter()
 
 
+async def release_profile_image(db: AsyncSession, filename: str | None) -> None:
+    """Delete a stored picture once no user refers to it any more."""
+    if filename is None:
+        return
+    # An upload of the same picture in this worker holds the lock until its
+    # user row is committed, so the count below cannot miss it. Uploads in
+    # other workers store their files again after committing.
+    async with profile_image_lock(filename):
+        result = await db.execute(
+            select(func.count())
+            .select_from(models.User)
+            .where(models.User.image_file == filename),
+        )
+        if not result.scalar():
+            delete_profile_image(filename)
+
+
 @router.post(
     "",
     response_model=UserPrivate,
@@ -78,7 +119,7 @@ async def create_user(user: UserCreate, db: Annotated[AsyncSession, Depends(get_
     new_user = models.User(
         username=user.username,
         email=user.email.lower(),
-        password_hash=hash_password(user.password),
+        password_hash=await hash_password(user.password),
     )
     db.add(new_user)
     await db.commit()
@@ -102,7 +143,7 @@ async def login_for_access_token(
 
     # Verify user exists and password is correct
     # Don't reveal which one failed (security best practice)
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user or not await verify_password(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -208,7 +249,7 @@ async def reset_password(
             detail="Invalid or expired reset token",
         )
 
-    user.password_hash = hash_password(request_data.new_password)
+    user.password_hash = await hash_password(request_data.new_password)
 
     await db.execute(
         sql_delete(models.PasswordResetToken).where(
@@ -217,6 +258,7 @@ async def reset_password(
     )
 
     await db.commit()
+    invalidate_cached_user(user.id)
     return {
         "message": "Password reset successfully. You can now log in with your new password.",
     }
@@ -228,13 +270,18 @@ async def change_password(
     current_user: CurrentUser,
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
-    if not verify_password(password_data.current_password, current_user.password_hash):
+    # Read fresh: the current user may come from USER_CACHE, which leaves
+    # the hash out
+    result = await db.execute(
+        select(models.User.password_hash).where(models.User.id == current_user.id),
+    )
+    if not await verify_password(password_data.current_password, result.scalar_one()):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect",
         )
 
-    current_user.password_hash = hash_password(password_data.new_password)
+    current_user.password_hash = await hash_password(password_data.new_password)
 
     await db.execute(
         sql_delete(models.PasswordResetToken).where(
@@ -243,58 +290,141 @@ async def change_password(
     )
 
     await db.commit()
+    invalidate_cached_user(current_user.id)
     return {"message": "Password changed successfully"}
 
 
 @router.get("/{user_id}", response_model=UserPublic)
-async def get_user(user_id: int, db: Annotated[AsyncSession, Depends(get_db)]):
-    result = await db.execute(select(models.User).where(models.User.id == user_id))
-    user = result.scalars().first()
-    if user:
-        return user
-    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+async def get_user(
+    request: Request,
+    user_id: int,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    async def validate() -> tuple[str, datetime | None]:
+        result = await db.execute(
+            select(models.User.updated_at).where(models.User.id == user_id),
+        )
+        updated_at = result.scalar()
+        if updated_at is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        return make_etag("user", user_id, updated_at), latest([updated_at])
+
+    etag, last_modified = await VERSION_FLIGHTS.do(("user", user_id), validate)
+    if (response := not_modified(request, etag, last_modified)) is not None:
+        return response
+
+    async def load() -> bytes:
+        result = await db.execute(select(models.User).where(models.User.id == user_id))
+        user = result.scalars().first()
+        if user:
+            return UserPublic.model_validate(user).model_dump_json().encode()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    return Response(
+        await READ_FLIGHTS.do(("user", user_id, etag), load),
+        media_type="application/json",
+        headers=validator_headers(etag, last_modified),
+    )
 
 
-@router.get("/{user_id}/posts", response_model=PaginatedPostsResponse)
+@router.get(
+    "/{user_id}/posts",
+    response_model=PaginatedPostsResponse | SideloadedPostsResponse,
+)
 async def get_user_posts(
+    request: Request,
     user_id: int,
     db: Annotated[AsyncSession, Depends(get_db)],
+    viewer_id: ViewerId,
     skip: Annotated[int, Query(ge=0)] = 0,
     limit: Annotated[int, Query(ge=1, le=100)] = settings.POSTS_PER_PAGE,
+    cursor: Annotated[str | None, Query()] = None,
+    include_total: bool = True,
+    sideload_authors: bool = False,
+    fields: Annotated[str | None, Query()] = None,
+    excerpt: bool = False,
 ):
-    result = await db.execute(select(models.User).where(models.User.id == user_id))
-    user = result.scalars().first()
-    if not user:
+    selected = parse_post_fields(fields, excerpt=excerpt)
+    if cursor is not None:
+        skip = 0
+
+    async def validate() -> tuple[str, int | None, PostIdSet | None]:
+        result = await db.execute(
+            user_feed_query(
+                user_id,
+                limit + 1,
+                skip=skip,
+                cursor=cursor,
+                columns=(models.User.updated_at, models.Post.id, models.Post.updated_at),
+            ),
+        )
+        versions = [tuple(row) for row in result]
+        if not versions:
+            # An offset past the last post leaves no row to carry the user; only
+            # users that exist get counted, so no counter is seeded for others
+            result = await db.execute(select(models.User.id).where(models.User.id == user_id))
+            if result.scalar() is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="User not found",
+                )
+        total = await count_posts(db, user_id) if include_total else None
+        # Personalized pages validate against the reader's flags for these posts
+        liked = await liked_post_ids(db, viewer_id) if viewer_id is not None else None
+        liked_flags = None if liked is None else [
+            post_id is not None and post_id in liked for _, post_id, _ in versions
+        ]
+        etag = make_etag("user_posts", user_id, skip, limit, cursor, total, versions, liked_flags)
+        return etag, total, liked
+
+    # Compare the client's validators against the page's version columns
+    # before loading and serializing full rows; identical concurrent reads
+    # share one round of version queries
+    etag, total, liked = await VERSION_FLIGHTS.do(
+        ("user_posts", user_id, skip, limit, cursor, include_total, viewer_id),
+        validate,
+    )
+    if (response := not_modified(request, etag)) is not None:
+        return response
+
+    query = user_feed_query(user_id, limit + 1, skip=skip, cursor=cursor)
+    if selected is not None:
+        query = query.options(load_post_fields(selected))
+    result = await db.execute(query)
+    user, posts = split_user_feed(result.all())
+    if user is None and skip > 0:
+        # An offset past the last post leaves no row to carry the user
+        result = await db.execute(select(models.User).where(models.User.id == user_id))
+        user = result.scalars().first()
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found",
         )
 
-    count_result = await db.execute(
-        select(func.count())
-        .select_from(models.Post)
-        .where(models.Post.user_id == user_id),
-    )
-    total = count_result.scalar() or 0
-
-    result = await db.execute(
-        select(models.Post)
-        .options(selectinload(models.Post.author))
-        .where(models.Post.user_id == user_id)
-        .order_by(models.Post.date_posted.desc())
-        .offset(skip)
-        .limit(limit),
-    )
-    posts = result.scalars().all()
-
-    has_more = skip + len(posts) < total
-
-    return PaginatedPostsResponse(
-        posts=[PostResponse.model_validate(post) for post in posts],
-        total=total,
-        skip=skip,
-        limit=limit,
-        has_more=has_more,
+    authors = {user.id: user} if sideload_authors else None
+    if selected is not None:
+        body = sparse_posts_json(
+            posts,
+            selected,
+            authors=authors,
+            limit=limit,
+            skip=skip,
+            total=total,
+            liked=liked,
+        )
+    elif authors is not None:
+        body = sideloaded_posts_json(
+            posts, authors, limit=limit, skip=skip, total=total, liked=liked,
+        )
+    else:
+        body = paginated_posts_json(
+            posts, limit=limit, skip=skip, total=total, liked=liked,
+        )
+    return Response(
+        body,
+        media_type="application/json",
+        headers=validator_headers(etag),
     )
 
 
@@ -355,6 +485,8 @@ async def update_user(
         user.email = user_update.email.lower()
 
     await db.commit()
+    invalidate_cached_user(user.id)
+    PAGE_CACHE.invalidate()
     await db.refresh(user)
     return user
 
@@ -381,11 +513,17 @@ async def delete_user(
 
     old_filename = user.image_file
 
+    await discard_user_count(db, user.id)
+    await discard_user_likes(db, user.id)
+    await search_backend(db).remove_user_posts(db, user.id)
     await db.delete(user)
     await db.commit()
+    invalidate_cached_user(user_id)
+    LIKED_POSTS.invalidate(user_id)
+    PAGE_CACHE.invalidate()
 
     if old_filename:
-        delete_profile_image(old_filename)
+        await release_profile_image(db, old_filename)
 
 
 @router.patch("/{user_id}/picture", response_model=UserPrivate)
@@ -401,30 +539,50 @@ async def upload_profile_picture(
             detail="Not authorized to update this user's picture",
         )
 
-    content = await file.read()
-
-    if len(content) > settings.MAX_UPLOAD_SIZE_BYTES:
+    # MaxBodySizeMiddleware has already capped the request body while it
+    # streamed in; this rejects a file part that fits within its slack.
+    if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE_BYTES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"File too large. Maximum size is {settings.MAX_UPLOAD_SIZE_BYTES // (1024 * 1024)}MB",
         )
 
     try:
-        new_filename = await run_in_threadpool(process_profile_image, content)
+        data, variants = await render_profile_image_in_pool(file.file)
     except UnidentifiedImageError as err:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid image file. Please upload a valid image (JPEG, PNG, GIF, WebP).",
         ) from err
+    except TimeoutError as err:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Image processing timed out. Please try again.",
+        ) from err
+    except BrokenProcessPool as err:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Image processing failed. Please try again.",
+        ) from err
 
     old_filename = current_user.image_file
 
-    current_user.image_file = new_filename
-    await db.commit()
+    async with profile_image_lock(profile_image_filename(data)):
+        new_filename, new_variants = await store_profile_image(data, variants)
+        current_user.image_file = new_filename
+        current_user.image_variants = new_variants
+        await db.commit()
+        # The lock only covers this worker: another one may have counted no
+        # users of this picture and deleted it before the commit above. Now
+        # that the row is visible to its count, store again to restore any
+        # file it took; files already in place are left as they are.
+        await store_profile_image(data, variants)
+    invalidate_cached_user(current_user.id)
+    PAGE_CACHE.invalidate()
     await db.refresh(current_user)
 
     if old_filename:
-        delete_profile_image(old_filename)
+        await release_profile_image(db, old_filename)
 
     return current_user
 
@@ -450,9 +608,12 @@ async def delete_user_picture(
         )
 
     current_user.image_file = None
+    current_user.image_variants = None
     await db.commit()
+    invalidate_cached_user(current_user.id)
+    PAGE_CACHE.invalidate()
     await db.refresh(current_user)
 
-    delete_profile_image(old_filename)
+    await release_profile_image(db, old_filename)
 
     return current_user
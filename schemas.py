@@ -18,6 +18,7 @@ class UserPublic(BaseModel):
     username: str
     image_file: str | None
     image_path: str
+    image_srcset: str
 
 
 class UserPrivate(UserPublic):
@@ -48,20 +49,49 @@ class PostUpdate(BaseModel):
     content: str | None = Field(default=None, min_length=1)
 
 
-class PostResponse(PostBase):
+class PostSummary(PostBase):
     model_config = ConfigDict(from_attributes=True)
     id: int
     user_id: int
     date_posted: datetime
+    # Only set on feeds read with a bearer token
+    liked_by_me: bool | None = None
+
+
+class PostResponse(PostSummary):
     author: UserPublic
 
 
+class PostLikes(BaseModel):
+    post_id: int
+    likes: int
+    liked_by_me: bool
+
+
 class PaginatedPostsResponse(BaseModel):
     posts: list[PostResponse]
-    total: int
+    total: int | None
+    skip: int
+    limit: int
+    has_more: bool
+    next_cursor: str | None = None
+
+
+class PostSearchResponse(BaseModel):
+    posts: list[PostResponse]
+    limit: int
+    has_more: bool
+    next_cursor: str | None = None
+
+
+class SideloadedPostsResponse(BaseModel):
+    posts: list[PostSummary]
+    authors: dict[int, UserPublic]
+    total: int | None
     skip: int
     limit: int
     has_more: bool
+    next_cursor: str | None = None
 
 
 class ForgotPasswordRequest(BaseModel):
@@ -0,0 +1,342 @@
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import os
+import re
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from fastapi import HTTPException, status
+from sqlalchemy import (
+    Float,
+    Integer,
+    Subquery,
+    and_,
+    event,
+    func,
+    literal_column,
+    or_,
+    select,
+    text,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, SessionTransaction
+
+import models
+from config import settings
+from database import AsyncSessionLocal
+from inverted_index import InvertedIndex
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+
+# Session.info key of the index changes waiting for their transaction
+_PENDING_INDEX_CHANGES = "pending_index_changes"
+
+
+class SearchBackend(ABC):
+    """A full-text index over post titles and content.
+
+    Backends whose index the database maintains itself leave the sync
+    hooks as no-ops.
+    """
+
+    @abstractmethod
+    async def search(
+        self,
+        db: AsyncSession,
+        query: str,
+        limit: int,
+        after: tuple[float, int] | None,
+    ) -> list[Any]:
+        """Return up to `limit` `(id, score)` rows matching `query`, best first.
+
+        `after` is the (score, id) of the last row of the previous page.
+        """
+
+    async def index_post(self, db: AsyncSession, post: models.Post) -> None:
+        pass
+
+    async def remove_post(self, db: AsyncSession, post_id: int) -> None:
+        pass
+
+    async def remove_user_posts(self, db: AsyncSession, user_id: int) -> None:
+        pass
+
+    async def clear(self, db: AsyncSession) -> None:
+        pass
+
+
+class DatabaseSearch(SearchBackend):
+    """Backend over a database index; `ranked` builds its matching rows.
+
+    Pages are keyed on (score, id) like the feeds are on (date, id), so
+    every page is an index lookup plus a top-N of the matches.
+    """
+
+    @abstractmethod
+    def ranked(self, query: str) -> Subquery | None:
+        """Subquery of `(id, score)` rows matching `query`, higher is better."""
+
+    async def search(
+        self,
+        db: AsyncSession,
+        query: str,
+        limit: int,
+        after: tuple[float, int] | None,
+    ) -> list[Any]:
+        ranked = self.ranked(query)
+        if ranked is None:
+            return []
+        statement = select(ranked.c.id, ranked.c.score)
+        if after is not None:
+            score, post_id = after
+            statement = statement.where(
+                or_(
+                    ranked.c.score < score,
+                    and_(ranked.c.score == score, ranked.c.id < post_id),
+                ),
+            )
+        result = await db.execute(
+            statement.order_by(ranked.c.score.desc(), ranked.c.id.desc()).limit(limit),
+        )
+        return list(result)
+
+
+class SQLiteSearch(DatabaseSearch):
+    """FTS5 table `posts_fts`, kept in sync by the post write handlers."""
+
+    def ranked(self, query: str) -> Subquery | None:
+        # Quote every word, so user input is never parsed as FTS5 syntax
+        match = " ".join(f'"{word}"' for word in _WORD_RE.findall(query))
+        if not match:
+            return None
+        # bm25() is lower-is-better; negated so both backends sort alike
+        return (
+            text(
+                "SELECT rowid AS id, -bm25(posts_fts, 10.0, 1.0) AS score "
+                "FROM posts_fts WHERE posts_fts MATCH :match",
+            )
+            .bindparams(match=match)
+            .columns(id=Integer, score=Float)
+            .subquery()
+        )
+
+    async def index_post(self, db: AsyncSession, post: models.Post) -> None:
+        await self.remove_post(db, post.id)
+        await db.execute(
+            text("INSERT INTO posts_fts (rowid, title, content) VALUES (:id, :title, :content)"),
+            {"id": post.id, "title": post.title, "content": post.content},
+        )
+
+    async def remove_post(self, db: AsyncSession, post_id: int) -> None:
+        await db.execute(text("DELETE FROM posts_fts WHERE rowid = :id"), {"id": post_id})
+
+    async def remove_user_posts(self, db: AsyncSession, user_id: int) -> None:
+        await db.execute(
+            text("DELETE FROM posts_fts WHERE rowid IN (SELECT id FROM posts WHERE user_id = :user_id)"),
+            {"user_id": user_id},
+        )
+
+    async def clear(self, db: AsyncSession) -> None:
+        await db.execute(text("DELETE FROM posts_fts"))
+
+
+class PostgresSearch(DatabaseSearch):
+    """Generated `posts.search_vector` column with a GIN index.
+
+    Postgres recomputes the vector on every write, so there is nothing to
+    sync from the handlers.
+    """
+
+    def ranked(self, query: str) -> Subquery | None:
+        if not query.strip():
+            return None
+        vector = literal_column("posts.search_vector")
+        tsquery = func.websearch_to_tsquery("simple", query)
+        return (
+            select(
+                models.Post.id.label("id"),
+                func.ts_rank_cd(vector, tsquery).label("score"),
+            )
+            .where(vector.op("@@")(tsquery))
+            .subquery()
+        )
+
+
+class MemorySearch(SearchBackend):
+    """In-process `InvertedIndex` of every post, for single-node deployments.
+
+    Built at startup, from a snapshot plus the posts changed since when
+    one exists, and kept current by the write handlers, whose changes
+    apply once their transaction commits. `run` also catches up on writes
+    made through other worker processes. Queries accept `word*` prefixes.
+    """
+
+    _SNAPSHOT_VERSION = 2
+
+    def __init__(self) -> None:
+        self.index = InvertedIndex()
+        # Latest posts.updated_at the index has caught up with
+        self._synced_to: datetime | None = None
+
+    async def search(
+        self,
+        db: AsyncSession,
+        query: str,
+        limit: int,
+        after: tuple[float, int] | None,
+    ) -> list[Any]:
+        return self.index.search(query, limit, after)
+
+    def _on_commit(self, db: AsyncSession, change: Callable[[], None]) -> None:
+        """Apply `change` to the index once `db` commits; drop it on rollback.
+
+        The index is not transactional, so changing it straight away would
+        leave a rolled back write searchable.
+        """
+        db.sync_session.info.setdefault(_PENDING_INDEX_CHANGES, []).append(change)
+
+    async def index_post(self, db: AsyncSession, post: models.Post) -> None:
+        post_id, title, content = post.id, post.title, post.content
+        self._on_commit(db, lambda: self.index.add(post_id, title, content))
+
+    async def remove_post(self, db: AsyncSession, post_id: int) -> None:
+        self._on_commit(db, lambda: self.index.remove(post_id))
+
+    async def remove_user_posts(self, db: AsyncSession, user_id: int) -> None:
+        result = await db.execute(select(models.Post.id).where(models.Post.user_id == user_id))
+        post_ids = result.scalars().all()
+
+        def remove() -> None:
+            for post_id in post_ids:
+                self.index.remove(post_id)
+
+        self._on_commit(db, remove)
+
+    async def clear(self, db: AsyncSession) -> None:
+        self.index = InvertedIndex()
+        self._synced_to = None
+
+    async def sync(self, db: AsyncSession) -> None:
+        """Index posts changed since the last sync and drop deleted ones."""
+        query = select(
+            models.Post.id,
+            models.Post.title,
+            models.Post.content,
+            models.Post.updated_at,
+        )
+        if self._synced_to is not None:
+            # Inclusive, so rows sharing the last timestamp are not missed;
+            # re-adding a post is idempotent
+            query = query.where(models.Post.updated_at >= self._synced_to)
+        result = await db.execute(query)
+        for post_id, title, content, updated_at in result:
+            self.index.add(post_id, title, content)
+            if self._synced_to is None or updated_at > self._synced_to:
+                self._synced_to = updated_at
+
+        result = await db.execute(select(models.Post.id))
+        for post_id in self.index.doc_ids() - set(result.scalars()):
+            self.index.remove(post_id)
+
+    def load_snapshot(self, path: Path) -> bool:
+        try:
+            with path.open(encoding="utf-8") as f:
+                snapshot = json.load(f)
+            if snapshot["version"] != self._SNAPSHOT_VERSION:
+                return False
+            index = InvertedIndex.from_dict(snapshot["index"])
+            synced_to = snapshot["synced_to"]
+            if synced_to is not None:
+                synced_to = datetime.fromisoformat(synced_to)
+        except (OSError, ValueError, TypeError, KeyError):
+            return False
+        self.index, self._synced_to = index, synced_to
+        return True
+
+    def save_snapshot(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Every worker saves on shutdown; a name of its own keeps them from
+        # writing into each other's file before the atomic replace
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        snapshot = {
+            "version": self._SNAPSHOT_VERSION,
+            "synced_to": None if self._synced_to is None else self._synced_to.isoformat(),
+            "index": self.index.to_dict(),
+        }
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        tmp.replace(path)
+
+    async def run(self, interval: float) -> None:
+        """Catch up every `interval` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with AsyncSessionLocal() as db:
+                    await self.sync(db)
+            except Exception:
+                logger.exception("Syncing the in-memory search index failed")
+
+
+MEMORY_SEARCH = MemorySearch()
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_index_changes(session: Session) -> None:
+    for change in session.info.pop(_PENDING_INDEX_CHANGES, ()):
+        change()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_index_changes(session: Session, previous_transaction: SessionTransaction) -> None:
+    # Only the outermost transaction's rollback discards the whole write
+    if previous_transaction.parent is None:
+        session.info.pop(_PENDING_INDEX_CHANGES, None)
+
+_BACKENDS: dict[str, SearchBackend] = {
+    "sqlite": SQLiteSearch(),
+    "postgresql": PostgresSearch(),
+}
+
+
+def search_backend(db: AsyncSession) -> SearchBackend:
+    if settings.SEARCH_BACKEND == "memory":
+        return MEMORY_SEARCH
+    return _BACKENDS[db.get_bind().dialect.name]
+
+
+def encode_search_cursor(score: float, post_id: int) -> str:
+    raw = f"{score!r}|{post_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        score_part, id_part = raw.rsplit("|", 1)
+        return float(score_part), int(id_part)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as err:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        ) from err
+
+
+async def search_posts(
+    db: AsyncSession,
+    query: str,
+    limit: int,
+    cursor: str | None = None,
+) -> list[Any]:
+    """Read up to `limit` `(id, score)` rows matching `query`, best first."""
+    after = decode_search_cursor(cursor) if cursor is not None else None
+    return await search_backend(db).search(db, query, limit, after)
@@ -0,0 +1,52 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+
+class _LeaderCancelled(Exception):
+    pass
+
+
+class SingleFlight[T]:
+    """Coalesce concurrent identical reads within one worker.
+
+    The first caller for a key runs the load; callers that arrive while it
+    is in flight await the same result (or exception) instead of running
+    their own. If the leading request is cancelled, a waiting caller takes
+    over.
+    """
+
+    def __init__(self) -> None:
+        self._flights: dict[Hashable, asyncio.Future[T]] = {}
+
+    async def do(self, key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+        while (flight := self._flights.get(key)) is not None:
+            try:
+                # Shielded so a waiter's cancellation leaves the flight alone
+                return await asyncio.shield(flight)
+            except _LeaderCancelled:
+                continue
+
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        try:
+            result = await load()
+        except asyncio.CancelledError:
+            flight.set_exception(_LeaderCancelled())
+            flight.exception()  # Retrieved here so it is never logged
+            raise
+        except BaseException as exc:
+            flight.set_exception(exc)
+            flight.exception()
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+
+READ_FLIGHTS: SingleFlight[bytes] = SingleFlight()
+# The validators of a read: its ETag and whatever it was computed from
+VERSION_FLIGHTS: SingleFlight[Any] = SingleFlight()
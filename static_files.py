@@ -0,0 +1,210 @@
+import contextlib
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+from pathlib import Path, PurePosixPath
+from typing import Any
+
+from jinja2 import pass_context
+from starlette.datastructures import URL, Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; only gzip siblings are written
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".svg", ".ico", ".json", ".webmanifest", ".txt"}
+# Preferred first when a client accepts several
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _accepted_encodings(scope: Scope) -> set[str]:
+    accepted = set()
+    for item in Headers(scope=scope).get("accept-encoding", "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles with content-hash ETags and long-lived caching.
+
+    With `fingerprint=True` every file is hashed at startup and can be
+    requested as `name.<hash>.ext`; those URLs change whenever the content
+    does, so they are served as immutable. Plain URLs keep working and are
+    revalidated against the content-hash ETag.
+
+    With `precompress=True` compressible files also get `.br` (when the
+    optional brotli package is installed) and `.gz` siblings written at
+    startup, and are served from those according to Accept-Encoding, so
+    nothing is compressed per request.
+
+    With `immutable=True` the directory is content-addressed already (file
+    names never get reused for different content) and every file is served
+    as immutable, with its file name as the ETag.
+
+    Range requests, and zero-copy `http.response.pathsend` on servers that
+    offer it, come from Starlette's FileResponse.
+    """
+
+    def __init__(
+        self,
+        *,
+        directory: str | os.PathLike[str],
+        fingerprint: bool = False,
+        precompress: bool = False,
+        immutable: bool = False,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(directory=directory, **kwargs)
+        self.immutable = immutable
+        self.hashes: dict[str, str] = {}
+        self.fingerprinted: dict[str, str] = {}
+        self.encodings: dict[str, list[str]] = {}
+        if fingerprint or precompress:
+            self._build_manifest(Path(directory), fingerprint, precompress)
+
+    def _build_manifest(self, root: Path, fingerprint: bool, precompress: bool) -> None:
+        encodings = [
+            encoding for encoding in ENCODING_SUFFIXES
+            if encoding != "br" or brotli is not None
+        ]
+        for filepath in sorted(root.rglob("*")):
+            if not filepath.is_file() or filepath.suffix in (".br", ".gz"):
+                continue
+            path = filepath.relative_to(root).as_posix()
+            data = filepath.read_bytes()
+            if fingerprint:
+                digest = hashlib.sha256(data).hexdigest()[:12]
+                self.hashes[path] = digest
+                self.fingerprinted[self._fingerprint(path, digest)] = path
+            if precompress and filepath.suffix in COMPRESSIBLE_SUFFIXES:
+                self.encodings[path] = [
+                    encoding for encoding in encodings
+                    if self._write_compressed(filepath, data, encoding)
+                ]
+
+    @staticmethod
+    def _write_compressed(filepath: Path, data: bytes, encoding: str) -> bool:
+        """Keep an up-to-date compressed sibling.
+
+        False if it would not help or cannot be written, e.g. because the
+        directory is read-only; the file is then served uncompressed.
+        """
+        target = filepath.with_name(filepath.name + ENCODING_SUFFIXES[encoding])
+        if target.exists() and target.stat().st_mtime >= filepath.stat().st_mtime:
+            return target.stat().st_size < len(data)
+        compressed = _compress(data, encoding)
+        # Written aside and renamed into place, so a failed write never
+        # leaves a truncated sibling that looks up to date next startup
+        tmp = target.with_name(f".{target.name}.tmp")
+        try:
+            if len(compressed) >= len(data):
+                target.unlink(missing_ok=True)
+                return False
+            tmp.write_bytes(compressed)
+            tmp.replace(target)
+        except OSError as err:
+            logger.warning("Serving %s uncompressed, cannot write %s: %s", filepath, target, err)
+            with contextlib.suppress(OSError):
+                tmp.unlink(missing_ok=True)
+            return False
+        return True
+
+    @staticmethod
+    def _fingerprint(path: str, digest: str) -> str:
+        posix = PurePosixPath(path)
+        return str(posix.with_name(f"{posix.stem}.{digest}{posix.suffix}"))
+
+    def url_path(self, path: str) -> str:
+        """Return the fingerprinted form of `path`, if it has one."""
+        digest = self.hashes.get(path)
+        return path if digest is None else self._fingerprint(path, digest)
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        posix = PurePosixPath(path).as_posix()
+        original = self.fingerprinted.get(posix)
+        scope = {
+            **scope,
+            "static_path": original or posix,
+            "static_immutable": self.immutable or original is not None,
+        }
+        return await super().get_response(original or path, scope)
+
+    def file_response(
+        self,
+        full_path: str | os.PathLike[str],
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        static_path = scope.get("static_path")
+        available = self.encodings.get(static_path, [])
+        accepted = _accepted_encodings(scope) if available else set()
+        encoding = next((enc for enc in available if enc in accepted), None)
+
+        if encoding is None:
+            response = FileResponse(
+                full_path,
+                status_code=status_code,
+                stat_result=stat_result,
+            )
+        else:
+            encoded_path = f"{full_path}{ENCODING_SUFFIXES[encoding]}"
+            response = FileResponse(
+                encoded_path,
+                status_code=status_code,
+                media_type=mimetypes.guess_type(str(full_path))[0],
+                stat_result=os.stat(encoded_path),
+            )
+            response.headers["content-encoding"] = encoding
+        if available:
+            response.headers["vary"] = "Accept-Encoding"
+
+        if static_path in self.hashes:
+            tag = self.hashes[static_path]
+            response.headers["etag"] = f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+        elif self.immutable:
+            response.headers["etag"] = f'"{Path(full_path).name}"'
+
+        response.headers["cache-control"] = (
+            IMMUTABLE_CACHE_CONTROL
+            if scope.get("static_immutable")
+            else REVALIDATE_CACHE_CONTROL
+        )
+
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def fingerprinted_url_for(static_files: CachedStaticFiles, name: str = "static"):
+    """Build a Jinja `url_for` that points `name` assets at fingerprinted URLs."""
+
+    @pass_context
+    def url_for(context: dict[str, Any], route_name: str, /, **path_params: Any) -> URL:
+        if route_name == name and "path" in path_params:
+            path_params["path"] = static_files.url_path(path_params["path"])
+        request = context["request"]
+        return request.url_for(route_name, **path_params)
+
+    return url_for
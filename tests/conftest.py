@@ -0,0 +1,62 @@
+import os
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+# main mounts static/ and templates/ relative to the working directory
+os.chdir(ROOT)
+
+# A throwaway SQLite database unless TEST_DATABASE_URL points at an empty
+# one elsewhere, e.g. Postgres; set before config is first imported
+_TMP_DIR = tempfile.mkdtemp(prefix="fastapi-blog-tests-")
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL",
+    f"sqlite+aiosqlite:///{_TMP_DIR}/test.db",
+)
+os.environ["SECRET_KEY"] = "test-secret-key"
+os.environ["SEARCH_SNAPSHOT_PATH"] = f"{_TMP_DIR}/search_index.json"
+
+import pytest
+from alembic.command import upgrade
+from alembic.config import Config
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_db():
+    """Bring the test database to the head revision, like a deployment would."""
+    upgrade(Config(str(ROOT / "alembic.ini")), "head")
+
+
+@pytest.fixture
+def client():
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def user(client):
+    """Register a fresh user; returns its JSON with the password added."""
+    name = uuid.uuid4().hex[:12]
+    response = client.post(
+        "/api/users",
+        json={"username": name, "email": f"{name}@example.com", "password": "password123"},
+    )
+    assert response.status_code == 201, response.text
+    return {**response.json(), "password": "password123"}
+
+
+@pytest.fixture
+def auth_headers(client, user):
+    """Headers authenticating as `user`."""
+    response = client.post(
+        "/api/users/token",
+        data={"username": user["email"], "password": user["password"]},
+    )
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
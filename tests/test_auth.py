@@ -0,0 +1,57 @@
+import auth
+
+
+def test_login_survives_a_killed_hash_worker(client, user):
+    credentials = {"username": user["email"], "password": user["password"]}
+    assert client.post("/api/users/token", data=credentials).status_code == 200
+
+    # As if the OOM killer took a worker: the pool is broken from here on
+    for process in list(auth._hash_executor._processes.values()):
+        process.kill()
+        process.join()
+
+    response = client.post("/api/users/token", data=credentials)
+    assert response.status_code == 200, response.text
+
+
+def test_password_change_drops_the_cached_user(client, user, auth_headers):
+    assert client.get("/api/users/me", headers=auth_headers).status_code == 200
+    assert auth.USER_CACHE.get(user["id"]) is not None
+
+    response = client.patch(
+        "/api/users/me/password",
+        json={"current_password": user["password"], "new_password": "new-password123"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200, response.text
+    assert auth.USER_CACHE.get(user["id"]) is None
+
+    old = {"username": user["email"], "password": user["password"]}
+    new = {"username": user["email"], "password": "new-password123"}
+    assert client.post("/api/users/token", data=old).status_code == 401
+    assert client.post("/api/users/token", data=new).status_code == 200
+
+
+def test_profile_update_is_not_served_from_the_cache(client, user, auth_headers):
+    assert client.get("/api/users/me", headers=auth_headers).json()["username"] == user["username"]
+
+    renamed = f"r{user['username']}"
+    response = client.patch(
+        f"/api/users/{user['id']}",
+        json={"username": renamed},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200, response.text
+    assert client.get("/api/users/me", headers=auth_headers).json()["username"] == renamed
+
+
+def test_deleted_user_is_not_served_from_the_cache(client, user, auth_headers):
+    assert client.get("/api/users/me", headers=auth_headers).status_code == 200
+    assert auth.USER_CACHE.get(user["id"]) is not None
+
+    response = client.delete(f"/api/users/{user['id']}", headers=auth_headers)
+    assert response.status_code == 204, response.text
+    assert auth.USER_CACHE.get(user["id"]) is None
+
+    response = client.get("/api/users/me", headers=auth_headers)
+    assert response.status_code == 401
@@ -0,0 +1,41 @@
+def _create_post(client, auth_headers) -> int:
+    response = client.post(
+        "/api/posts",
+        json={"title": "Conditional", "content": "Validators for conditional reads"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def test_unchanged_post_is_not_modified(client, auth_headers):
+    post_id = _create_post(client, auth_headers)
+    response = client.get(f"/api/posts/{post_id}")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    response = client.get(f"/api/posts/{post_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert not response.content
+
+
+def test_liking_a_post_changes_the_readers_feed_etag(client, auth_headers):
+    post_id = _create_post(client, auth_headers)
+    params = {"limit": 100}
+    response = client.get("/api/posts", params=params, headers=auth_headers)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    conditional = {**auth_headers, "If-None-Match": etag}
+    response = client.get("/api/posts", params=params, headers=conditional)
+    assert response.status_code == 304
+
+    response = client.post(f"/api/posts/{post_id}/like", headers=auth_headers)
+    assert response.status_code == 200, response.text
+
+    response = client.get("/api/posts", params=params, headers=conditional)
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    post = next(post for post in response.json()["posts"] if post["id"] == post_id)
+    assert post["liked_by_me"] is True
@@ -0,0 +1,68 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import select
+
+import likes
+import models
+from database import AsyncSessionLocal, engine
+from likes import LikeAccumulator
+
+
+async def _create_post() -> int:
+    async with AsyncSessionLocal() as db:
+        name = uuid.uuid4().hex[:12]
+        author = models.User(username=name, email=f"{name}@example.com", password_hash="x")
+        post = models.Post(title="Title", content="Content", excerpt="Content", author=author)
+        db.add(post)
+        await db.commit()
+        return post.id
+
+
+async def _likes(post_id: int) -> int:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(models.Post.likes).where(models.Post.id == post_id))
+        return result.scalar_one()
+
+
+def test_flush_writes_pending_deltas():
+    accumulator = LikeAccumulator()
+
+    async def main() -> int:
+        try:
+            post_id = await _create_post()
+            for delta in (1, 1, 1, -1):
+                accumulator.add(post_id, delta)
+            assert accumulator.pending(post_id) == 2
+            await accumulator.flush()
+            assert accumulator.pending(post_id) == 0
+            return await _likes(post_id)
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(main()) == 2
+
+
+def test_failed_flush_merges_deltas_back(monkeypatch):
+    accumulator = LikeAccumulator()
+    accumulator.add(1, 3)
+    accumulator.add(2, -1)
+
+    class FailingSession:
+        async def __aenter__(self):
+            # Likes arriving while the write is in flight
+            accumulator.add(1, 2)
+            accumulator.add(3, 1)
+            raise ConnectionError("database unavailable")
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+    monkeypatch.setattr(likes, "AsyncSessionLocal", FailingSession)
+    with pytest.raises(ConnectionError):
+        asyncio.run(accumulator.flush())
+
+    assert accumulator.pending(1) == 5
+    assert accumulator.pending(2) == -1
+    assert accumulator.pending(3) == 1
@@ -0,0 +1,75 @@
+import asyncio
+
+from starlette.responses import Response
+
+from config import settings
+from page_cache import PageCache
+
+TTL = 0.05
+
+
+def _renderer(bodies: list[str]):
+    """Render `v1`, `v2`, ... in turn, recording each body in `bodies`."""
+
+    async def render() -> Response:
+        bodies.append(f"v{len(bodies) + 1}")
+        return Response(bodies[-1])
+
+    return render
+
+
+def test_stale_page_is_served_while_one_refresh_runs(monkeypatch):
+    monkeypatch.setattr(settings, "PAGE_CACHE_STALE_SECONDS", 60)
+    cache = PageCache()
+    bodies: list[str] = []
+    render = _renderer(bodies)
+
+    async def main() -> list[bytes]:
+        served = [(await cache.get_or_render("page", TTL, render, render)).body]
+        await asyncio.sleep(TTL * 2)
+        # Both stale reads get the old page; only one refresh is started
+        for _ in range(2):
+            served.append((await cache.get_or_render("page", TTL, render, render)).body)
+        await asyncio.gather(*cache._tasks)
+        served.append((await cache.get_or_render("page", TTL, render, render)).body)
+        return served
+
+    assert asyncio.run(main()) == [b"v1", b"v1", b"v1", b"v2"]
+    assert bodies == ["v1", "v2"]
+
+
+def test_invalidate_drops_cached_pages():
+    cache = PageCache()
+    bodies: list[str] = []
+    render = _renderer(bodies)
+
+    async def main() -> list[bytes]:
+        served = [(await cache.get_or_render("page", 60, render, render)).body]
+        served.append((await cache.get_or_render("page", 60, render, render)).body)
+        cache.invalidate()
+        served.append((await cache.get_or_render("page", 60, render, render)).body)
+        return served
+
+    assert asyncio.run(main()) == [b"v1", b"v1", b"v2"]
+
+
+def test_render_started_before_a_write_is_not_stored():
+    cache = PageCache()
+    bodies: list[str] = []
+    render = _renderer(bodies)
+    written = asyncio.Event()
+
+    async def slow_render() -> Response:
+        response = await render()
+        await written.wait()
+        return response
+
+    async def main() -> bytes:
+        task = asyncio.create_task(cache.get_or_render("page", 60, slow_render, slow_render))
+        await asyncio.sleep(0)
+        cache.invalidate()
+        written.set()
+        assert (await task).body == b"v1"
+        return (await cache.get_or_render("page", 60, render, render)).body
+
+    assert asyncio.run(main()) == b"v2"
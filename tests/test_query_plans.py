@@ -0,0 +1,117 @@
+"""Query-plan regressions for the hot queries of the routers and pages.
+
+Each statement is planned against the migrated test database, so a
+migration that loses an index (or a query that stops matching one) shows
+up as a full table scan or an extra sort. On Postgres, sequential scans
+and sorts are priced out first, so any that remain had no index to use.
+"""
+import asyncio
+import re
+from datetime import UTC, datetime
+
+import pytest
+from sqlalchemy import Executable, delete, event, func, select, text
+
+import models
+from database import AsyncSessionLocal, engine
+from pagination import FEED_ORDER, encode_cursor, posts_after, user_feed_query
+
+CURSOR = encode_cursor(models.Post(id=10, date_posted=datetime(2026, 1, 1, tzinfo=UTC)))
+SINCE = datetime(2026, 1, 1, tzinfo=UTC)
+
+_feed_versions = select(
+    models.Post.id,
+    models.Post.updated_at,
+    models.User.updated_at,
+).join(models.Post.author)
+
+QUERIES: dict[str, Executable] = {
+    "feed": select(models.Post).order_by(*FEED_ORDER).offset(0).limit(11),
+    "feed after cursor": select(models.Post)
+    .where(posts_after(CURSOR))
+    .order_by(*FEED_ORDER)
+    .limit(11),
+    "feed versions": _feed_versions.order_by(*FEED_ORDER).offset(0).limit(11),
+    "feed versions after cursor": _feed_versions.where(posts_after(CURSOR))
+    .order_by(*FEED_ORDER)
+    .limit(11),
+    "post count": select(func.count()).select_from(models.Post),
+    "post versions": select(models.Post.updated_at, models.User.updated_at)
+    .join(models.Post.author)
+    .where(models.Post.id == 1),
+    "posts by id": select(models.Post).where(models.Post.id.in_([1, 2, 3])),
+    "authors by id": select(models.User).where(models.User.id.in_([1, 2, 3])),
+    "user feed": user_feed_query(1, 11),
+    "user feed after cursor": user_feed_query(1, 11, cursor=CURSOR),
+    "user post count": select(func.count())
+    .select_from(models.Post)
+    .where(models.Post.user_id == 1),
+    "post counter": select(models.PostCount.value).where(models.PostCount.key == "user:1"),
+    "user by email": select(models.User).where(func.lower(models.User.email) == "a@example.com"),
+    "user by username": select(models.User).where(func.lower(models.User.username) == "a"),
+    "picture users": select(func.count())
+    .select_from(models.User)
+    .where(models.User.image_file == "0" * 32 + ".jpg"),
+    "reset token": select(models.PasswordResetToken).where(
+        models.PasswordResetToken.token_hash == "0" * 64,
+    ),
+    "user reset tokens": delete(models.PasswordResetToken).where(
+        models.PasswordResetToken.user_id == 1,
+    ),
+    "liked posts": select(models.PostLike.post_id).where(models.PostLike.user_id == 1),
+    "post likes": delete(models.PostLike).where(models.PostLike.post_id == 1),
+    "recent likes": select(models.PostLike.post_id, models.PostLike.created_at).where(
+        models.PostLike.created_at > SINCE,
+    ),
+    "recent posts": select(models.Post.id, models.Post.date_posted).where(
+        models.Post.date_posted > SINCE,
+    ),
+}
+
+_SQLITE_TABLE_SCAN = re.compile(r"SCAN \w+( AS \w+)?")
+_POSTGRES_SORT = re.compile(r"(->\s+)?(Incremental )?Sort\b")
+
+
+def _problems(dialect: str, plan: list[str]) -> list[str]:
+    if dialect == "sqlite":
+        return [
+            line for line in plan
+            if _SQLITE_TABLE_SCAN.fullmatch(line) or "USE TEMP B-TREE" in line
+        ]
+    return [
+        line for line in plan
+        if "Seq Scan" in line or _POSTGRES_SORT.match(line.strip())
+    ]
+
+
+async def _plan(statement: Executable) -> list[str]:
+    """Plan `statement` as the database would run it, bound parameters included."""
+    dialect = engine.dialect.name
+    plan: list[str] = []
+
+    def explain(conn, cursor, sql, parameters, context, executemany):
+        prefix = "EXPLAIN QUERY PLAN " if dialect == "sqlite" else "EXPLAIN "
+        cursor.execute(prefix + sql, parameters)
+        plan.extend(str(row[-1]) for row in cursor.fetchall())
+
+    try:
+        async with AsyncSessionLocal() as db:
+            if dialect == "postgresql":
+                await db.execute(text("SET LOCAL enable_seqscan = off"))
+                await db.execute(text("SET LOCAL enable_sort = off"))
+            event.listen(engine.sync_engine, "before_cursor_execute", explain)
+            try:
+                await db.execute(statement)
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", explain)
+            await db.rollback()
+    finally:
+        await engine.dispose()
+    return plan
+
+
+@pytest.mark.parametrize("name", QUERIES)
+def test_query_uses_indexes(name):
+    plan = asyncio.run(_plan(QUERIES[name]))
+    assert plan
+    assert not _problems(engine.dialect.name, plan), "\n".join(plan)
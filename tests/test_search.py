@@ -0,0 +1,88 @@
+import asyncio
+import uuid
+from datetime import UTC, datetime
+
+import pytest
+
+import models
+from config import settings
+from database import AsyncSessionLocal, engine
+from search import MemorySearch
+
+
+@pytest.mark.parametrize("backend", ["database", "memory"])
+def test_search_pages_follow_next_cursor(client, auth_headers, monkeypatch, backend):
+    monkeypatch.setattr(settings, "SEARCH_BACKEND", backend)
+    word = f"w{uuid.uuid4().hex}"
+    created = set()
+    # Repeating the word ranks the posts apart
+    for repeats in (1, 2, 3):
+        response = client.post(
+            "/api/posts",
+            json={"title": f"Post {repeats}", "content": " ".join([word] * repeats)},
+            headers=auth_headers,
+        )
+        assert response.status_code == 201, response.text
+        created.add(response.json()["id"])
+
+    seen = []
+    params = {"q": word, "limit": 1}
+    while True:
+        response = client.get("/api/posts/search", params=params)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        seen.extend(post["id"] for post in page["posts"])
+        if not page["has_more"]:
+            break
+        params["cursor"] = page["next_cursor"]
+
+    assert len(seen) == len(created)
+    assert set(seen) == created
+
+
+def test_memory_index_changes_wait_for_commit():
+    search = MemorySearch()
+    word = f"w{uuid.uuid4().hex}"
+
+    async def write(commit: bool) -> int:
+        try:
+            async with AsyncSessionLocal() as db:
+                name = uuid.uuid4().hex[:12]
+                author = models.User(username=name, email=f"{name}@example.com", password_hash="x")
+                post = models.Post(title=word, content=word, excerpt=word, author=author)
+                db.add(post)
+                await db.flush()
+                await search.index_post(db, post)
+                assert search.index.search(word, 10) == []
+                if commit:
+                    await db.commit()
+                else:
+                    await db.rollback()
+                return post.id
+        finally:
+            await engine.dispose()
+
+    asyncio.run(write(commit=False))
+    assert search.index.search(word, 10) == []
+    post_id = asyncio.run(write(commit=True))
+    assert [doc_id for doc_id, _ in search.index.search(word, 10)] == [post_id]
+
+
+def test_memory_snapshot_round_trip(tmp_path):
+    search = MemorySearch()
+    search.index.add(1, "Héllo world", "bar bar baz")
+    search.index.add(2, "", "")
+    search.index.add(3, "bar", "qux")
+    search._synced_to = datetime(2026, 1, 1, tzinfo=UTC)
+    path = tmp_path / "search_index.json"
+    search.save_snapshot(path)
+
+    loaded = MemorySearch()
+    assert loaded.load_snapshot(path)
+    assert loaded._synced_to == search._synced_to
+    assert len(loaded.index) == 3
+    for query in ("bar", "hel*", "world bar", "qux"):
+        assert loaded.index.search(query, 10) == search.index.search(query, 10)
+
+    path.write_text("not json")
+    assert not loaded.load_snapshot(path)
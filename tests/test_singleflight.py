@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_load():
+    flights: SingleFlight[int] = SingleFlight()
+    calls = 0
+
+    async def load() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def main() -> list[int]:
+        return await asyncio.gather(*(flights.do("key", load) for _ in range(10)))
+
+    assert asyncio.run(main()) == [42] * 10
+    assert calls == 1
+
+
+def test_waiters_share_the_leaders_exception():
+    flights: SingleFlight[int] = SingleFlight()
+    calls = 0
+
+    async def load() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main() -> list[BaseException | int]:
+        return await asyncio.gather(
+            *(flights.do("key", load) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(main())
+    assert calls == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_waiter_takes_over_when_the_leader_is_cancelled():
+    flights: SingleFlight[str] = SingleFlight()
+    started: list[str] = []
+
+    def loader(name: str):
+        async def load() -> str:
+            started.append(name)
+            await asyncio.sleep(0.05)
+            return name
+
+        return load
+
+    async def main() -> str:
+        leader = asyncio.create_task(flights.do("key", loader("leader")))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flights.do("key", loader("waiter")))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await waiter
+
+    assert asyncio.run(main()) == "waiter"
+    assert started == ["leader", "waiter"]
+
+
+def test_cancelled_waiter_leaves_the_flight_running():
+    flights: SingleFlight[int] = SingleFlight()
+
+    async def load() -> int:
+        await asyncio.sleep(0.02)
+        return 7
+
+    async def main() -> int:
+        leader = asyncio.create_task(flights.do("key", load))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flights.do("key", load))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await leader
+
+    assert asyncio.run(main()) == 7
@@ -0,0 +1,87 @@
+import asyncio
+import heapq
+import logging
+import time
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from config import settings
+from database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class TrendingIndex:
+    """In-memory ranking of posts by recent likes, recomputed in the background.
+
+    A post scores one point for being posted and one per like, each decayed
+    by `TRENDING_HALF_LIFE_HOURS` from when it happened. Scores are kept
+    relative to a fixed epoch, so they only ever grow and ranking never
+    needs a re-score: `refresh` just adds the weights of likes and posts
+    created since the last run. Every `TRENDING_REBUILD_SECONDS` the scores
+    are rebuilt from the last `TRENDING_WINDOW_HOURS`, which drops old
+    activity and accounts for unlikes and deletions. Readers only ever see
+    the precomputed `top` list.
+    """
+
+    def __init__(self) -> None:
+        self.top: list[int] = []
+        self._scores: dict[int, float] = {}
+        self._epoch = datetime.now(UTC)
+        self._likes_seen: datetime | None = None
+        self._posts_seen: datetime | None = None
+        self._rebuilt_at: float | None = None
+
+    def _weight(self, when: datetime) -> float:
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=UTC)
+        elapsed = (when - self._epoch).total_seconds()
+        return 2 ** (elapsed / (settings.TRENDING_HALF_LIFE_HOURS * 3600))
+
+    async def _add_since(self, db: AsyncSession, since: datetime) -> None:
+        # Rows committed with a timestamp older than the cursor are missed
+        # until the next rebuild picks them up
+        result = await db.execute(
+            select(models.PostLike.post_id, models.PostLike.created_at)
+            .where(models.PostLike.created_at > (self._likes_seen or since)),
+        )
+        for post_id, created_at in result:
+            self._scores[post_id] = self._scores.get(post_id, 0.0) + self._weight(created_at)
+            self._likes_seen = max(self._likes_seen or created_at, created_at)
+
+        result = await db.execute(
+            select(models.Post.id, models.Post.date_posted)
+            .where(models.Post.date_posted > (self._posts_seen or since)),
+        )
+        for post_id, date_posted in result:
+            self._scores[post_id] = self._scores.get(post_id, 0.0) + self._weight(date_posted)
+            self._posts_seen = max(self._posts_seen or date_posted, date_posted)
+
+    async def refresh(self, db: AsyncSession) -> None:
+        now = time.monotonic()
+        if self._rebuilt_at is None or now - self._rebuilt_at >= settings.TRENDING_REBUILD_SECONDS:
+            since = datetime.now(UTC) - timedelta(hours=settings.TRENDING_WINDOW_HOURS)
+            self._scores = {}
+            self._epoch = since
+            self._likes_seen = self._posts_seen = None
+            self._rebuilt_at = now
+        else:
+            since = self._epoch
+        await self._add_since(db, since)
+        self.top = heapq.nlargest(settings.TRENDING_SIZE, self._scores, key=self._scores.__getitem__)
+
+    async def run(self, interval: float) -> None:
+        """Refresh now and then every `interval` seconds until cancelled."""
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    await self.refresh(db)
+            except Exception:
+                logger.exception("Refreshing trending posts failed")
+            await asyncio.sleep(interval)
+
+
+TRENDING = TrendingIndex()